@@ -0,0 +1,240 @@
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+RANKINGS_DIR = Path("pvp/fixtures/rankings")
+ARTIFACTS_DIR = Path("pvp/artifacts/rankings")
+
+MAGIC = b"PVPR"
+VERSION = 1
+MAX_MOVESET = 3
+MAX_MATCHUPS = 5
+MAX_SCORES = 6
+NONE = 0xFFFF
+
+HAS_SCORES = 1
+HAS_STATS = 2
+
+# magic, version, rows, strings, string offsets, string blob, rows, moves
+HEADER = struct.Struct("<4sHIIIIII")
+# speciesId, speciesName, rating, flags, moveset/matchups/counters lengths, score,
+# moveset, matchups (opponent, rating, opRating), counters, scores,
+# stats (product, atk, def, hp), moves (start, fast count, charged count)
+ROW = struct.Struct(
+    "<HHHBBBBd"
+    f"{MAX_MOVESET}H"
+    f"{MAX_MATCHUPS * 3}H"
+    f"{MAX_MATCHUPS * 3}H"
+    f"{MAX_SCORES}d"
+    "IddH"
+    "IHH"
+)
+MOVE = struct.Struct("<Hi")
+OFFSET = struct.Struct("<I")
+
+
+def artifact_path(format, cp, category) -> Path:
+    return ARTIFACTS_DIR / format / category / f"rankings-{cp}.bin"
+
+
+def fixture_path(format, cp, category) -> Path:
+    return RANKINGS_DIR / format / category / f"rankings-{cp}.json"
+
+
+def scenarios() -> list:
+    """(cup, cp, category) of every ranking fixture."""
+    return [(p.parts[-3], p.stem.split("-")[1], p.parts[-2])
+            for p in sorted(RANKINGS_DIR.glob("*/*/rankings-*.json"))]
+
+
+def _number(value):
+    # pvpoke writes integral numbers without a fraction, keep it that way
+    return int(value) if value.is_integer() else value
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def __call__(self, value):
+        if value is None:
+            return NONE
+        if value not in self.index:
+            self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return self.index[value]
+
+
+def _pad(values, size, fill=NONE):
+    return list(values) + [fill] * (size - len(values))
+
+
+def _pack_matchups(matchups, strings):
+    if len(matchups) > MAX_MATCHUPS:
+        raise ValueError(f"more than {MAX_MATCHUPS} matchups")
+    packed = []
+    for m in matchups:
+        packed += [strings(m["opponent"]), m["rating"], m.get("opRating", NONE)]
+    return _pad(packed, MAX_MATCHUPS * 3)
+
+
+def encode(rankings) -> bytes:
+    strings = StringTable()
+    rows = []
+    moves = []
+    for item in rankings:
+        moveset = item["moveset"]
+        if len(moveset) > MAX_MOVESET:
+            raise ValueError(f"{item['speciesId']}: more than {MAX_MOVESET} moves in moveset")
+        scores = item.get("scores")
+        stats = item.get("stats")
+        flags = (HAS_SCORES if scores is not None else 0) | (HAS_STATS if stats is not None else 0)
+        fast_moves = item["moves"]["fastMoves"]
+        charged_moves = item["moves"]["chargedMoves"]
+        moves_start = len(moves)
+        for m in fast_moves + charged_moves:
+            moves.append((strings(m["moveId"]), -1 if m["uses"] is None else m["uses"]))
+        stats = stats or {"product": 0, "atk": 0, "def": 0, "hp": 0}
+        rows.append(ROW.pack(
+            strings(item["speciesId"]),
+            strings(item["speciesName"]),
+            item["rating"],
+            flags,
+            len(moveset),
+            len(item["matchups"]),
+            len(item["counters"]),
+            item["score"],
+            *_pad([strings(m) for m in moveset], MAX_MOVESET),
+            *_pack_matchups(item["matchups"], strings),
+            *_pack_matchups(item["counters"], strings),
+            *_pad(scores or [], MAX_SCORES, 0),
+            stats["product"], stats["atk"], stats["def"], stats["hp"],
+            moves_start, len(fast_moves), len(charged_moves),
+        ))
+
+    blob = bytearray()
+    offsets = [0]
+    for s in strings.strings:
+        blob += s.encode()
+        offsets.append(len(blob))
+
+    offsets_at = HEADER.size
+    blob_at = offsets_at + OFFSET.size * len(offsets)
+    rows_at = blob_at + len(blob)
+    moves_at = rows_at + ROW.size * len(rows)
+    header = HEADER.pack(MAGIC, VERSION, len(rows), len(strings.strings), offsets_at, blob_at, rows_at, moves_at)
+    return b"".join([
+        header,
+        b"".join(OFFSET.pack(o) for o in offsets),
+        bytes(blob),
+        b"".join(rows),
+        b"".join(MOVE.pack(*m) for m in moves),
+    ])
+
+
+def write_artifact(source: Path, target: Path):
+    with open(source) as file:
+        data = encode(json.load(file))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as file:
+        file.write(data)
+    # readers keep their mapping of the old inode, new readers get the new file
+    os.replace(tmp, target)
+    return len(data)
+
+
+class RankingArtifact:
+    """Read-only view over a ranking artifact; rows are decoded on access."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._rows, n_strings, offsets_at, blob_at, self._rows_at, self._moves_at = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} ranking artifact")
+        offsets = struct.unpack_from(f"<{n_strings + 1}I", self._mm, offsets_at)
+        self._strings = [
+            self._mm[blob_at + offsets[i]:blob_at + offsets[i + 1]].decode()
+            for i in range(n_strings)
+        ]
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(i) for i in range(*index.indices(self._rows))]
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError("ranking index out of range")
+        return self._decode(index)
+
+    def __iter__(self):
+        for i in range(self._rows):
+            yield self._decode(i)
+
+    def _matchups(self, packed, count):
+        matchups = []
+        for i in range(count):
+            opponent, rating, op_rating = packed[3 * i:3 * i + 3]
+            matchup = {"opponent": self._strings[opponent], "rating": rating}
+            if op_rating != NONE:
+                matchup["opRating"] = op_rating
+            matchups.append(matchup)
+        return matchups
+
+    def _moves(self, start, count):
+        moves = []
+        for i in range(start, start + count):
+            move, uses = MOVE.unpack_from(self._mm, self._moves_at + i * MOVE.size)
+            moves.append({"moveId": self._strings[move], "uses": None if uses < 0 else uses})
+        return moves
+
+    def _decode(self, index):
+        row = ROW.unpack_from(self._mm, self._rows_at + index * ROW.size)
+        species, name, rating, flags, n_moveset, n_matchups, n_counters, score = row[:8]
+        at = 8
+        moveset = row[at:at + n_moveset]
+        at += MAX_MOVESET
+        matchups = row[at:at + MAX_MATCHUPS * 3]
+        at += MAX_MATCHUPS * 3
+        counters = row[at:at + MAX_MATCHUPS * 3]
+        at += MAX_MATCHUPS * 3
+        scores = row[at:at + MAX_SCORES]
+        at += MAX_SCORES
+        product, atk, defense, hp, moves_start, n_fast, n_charged = row[at:]
+        item = {
+            "speciesId": self._strings[species],
+            "speciesName": self._strings[name],
+            "rating": rating,
+            "matchups": self._matchups(matchups, n_matchups),
+            "counters": self._matchups(counters, n_counters),
+            "moves": {
+                "fastMoves": self._moves(moves_start, n_fast),
+                "chargedMoves": self._moves(moves_start + n_fast, n_charged),
+            },
+            "moveset": [self._strings[m] for m in moveset],
+            "score": _number(score),
+        }
+        if flags & HAS_SCORES:
+            item["scores"] = [_number(s) for s in scores]
+        if flags & HAS_STATS:
+            item["stats"] = {"product": product, "atk": _number(atk), "def": _number(defense), "hp": hp}
+        item["position"] = index + 1
+        return item
+
+
+def open_artifact(format, cp, category):
+    """Return the artifact for a scenario, or None if it is missing or older than its fixture."""
+    path = artifact_path(format, cp, category)
+    try:
+        if path.stat().st_mtime < fixture_path(format, cp, category).stat().st_mtime:
+            return None
+    except FileNotFoundError:
+        return None
+    return RankingArtifact(path)
@@ -0,0 +1,189 @@
+"""Benchmarks of the ranking hot paths, run by ``manage.py benchmark``.
+
+Every case is timed once cold (versioned caches and the fragment cache
+emptied first) and then ``repeat`` times warm. The cold run is repeated
+under tracemalloc for its peak memory and under a query capture for the
+number and time of its SQL queries.
+"""
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from pvp.artifacts import RANKINGS_DIR
+from pvp.cache import clear_caches
+
+BENCHMARKS_DIR = Path("benchmarks")
+REPEAT = 5
+LARGEST_FILES = 3
+FILTER_ROWS = 100
+
+
+@dataclass
+class Case:
+    name: str
+    func: callable
+    repeat: int = REPEAT
+    # cases that change the data (load_data) are only timed once
+    warm: bool = True
+
+
+def cold():
+    clear_caches()
+    cache.clear()
+
+
+def _timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def measure(case: Case) -> dict:
+    cold()
+    cold_time = _timed(case.func)
+    cold()
+    tracemalloc.start()
+    try:
+        case.func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    cold()
+    with CaptureQueriesContext(connection) as queries:
+        case.func()
+    result = {
+        "cold": cold_time,
+        "peak_memory": peak,
+        "queries": len(queries),
+        "query_time": sum(float(q["time"]) for q in queries.captured_queries),
+    }
+    if case.warm:
+        warm = [_timed(case.func) for _ in range(case.repeat)]
+        result.update(warm_min=min(warm), warm_median=statistics.median(warm), warm_mean=statistics.fmean(warm))
+    return result
+
+
+def largest_rankings(n=LARGEST_FILES) -> list:
+    """(cup, cp, category) of the biggest ranking fixtures of the loaded formats."""
+    from pvp.registry import get_registry
+    formats = get_registry().formats
+    files = sorted(RANKINGS_DIR.glob("*/*/rankings-*.json"), key=lambda p: p.stat().st_size, reverse=True)
+    scenarios = [(p.parts[-3], p.stem.split("-")[1], p.parts[-2]) for p in files]
+    return [s for s in scenarios if s[:2] in formats][:n]
+
+
+def _get(client, url, htmx=False):
+    headers = {"HX-Request": "true"} if htmx else {}
+
+    def request():
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, f"{url}: {response.status_code}"
+        response.content
+    return request
+
+
+def _filters(cup, cp, category):
+    from pvp.registry import get_registry
+    from pvp.templatetags import ranking_tags
+    from pvp.views.rankings import load_ranking_context
+
+    def run():
+        species = get_registry().species
+        for item in load_ranking_context(cup, cp, category)[:FILTER_ROWS]:
+            # rankings list variants (e.g. the _xs entries) that the gamemaster has no species for
+            if item["speciesId"] not in species:
+                continue
+            ranking_tags.move_str(item["moveset"])
+            ranking_tags.rating(item["rating"])
+            ranking_tags.weaknesses(item["speciesId"])
+            for matchup in item["matchups"]:
+                ranking_tags.rating(matchup["rating"])
+    return run
+
+
+def cases(load_data=True) -> list:
+    from pvp.views.rankings import load_ranking_context
+
+    client = Client()
+    result = []
+    for cup, cp, category in largest_rankings():
+        result.append(Case(f"load_ranking_context[{cup}/{cp}/{category}]",
+                           lambda c=(cup, cp, category): len(load_ranking_context(*c))))
+    cup, cp, category = largest_rankings(1)[0]
+    url = f"/rankings/{cup}/{cp}/{category}/"
+    result += [
+        Case("rankings[page]", _get(client, url)),
+        Case("rankings[htmx]", _get(client, url, htmx=True)),
+        Case("rankings[htmx, page 5]", _get(client, f"{url}?page=5", htmx=True)),
+        Case("get_move", _get(client, f"{url}1/moves/", htmx=True)),
+        Case("template filters", _filters(cup, cp, category)),
+    ]
+    if load_data:
+        result.append(Case("load_data", lambda: call_command("load_data", stdout=io.StringIO()), warm=False))
+    return result
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(selected=None, load_data=True, progress=None) -> dict:
+    results = {}
+    # the test client talks to "testserver"
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        for case in cases(load_data):
+            if selected and not any(s in case.name for s in selected):
+                continue
+            results[case.name] = measure(case)
+            if progress:
+                progress(case.name, results[case.name])
+    return {
+        "commit": _commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "results": results,
+    }
+
+
+def save(report, directory=BENCHMARKS_DIR) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{report['created'].replace(':', '')}-{report['commit'] or 'local'}.json"
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+    return path
+
+
+def regressions(report, baseline, tolerance) -> list:
+    """(case, metric, baseline, current) for timings and query counts worse than ``baseline`` by more than ``tolerance``."""
+    found = []
+    for name, current in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for metric in ("cold", "warm_median", "queries"):
+            if metric not in current or metric not in previous:
+                continue
+            limit = previous[metric] * (1 + tolerance) if metric != "queries" else previous[metric]
+            if current[metric] > limit:
+                found.append((name, metric, previous[metric], current[metric]))
+    return found
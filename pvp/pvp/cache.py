@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper
+
+from django.conf import settings
+
+from pvp.metrics import cache_lookup
+
+FIXTURES_DIR = "pvp/fixtures"
+# the only artifacts that are read in place of their source; everything else
+# under pvp/artifacts is derived and must not flush the caches when rebuilt
+RANKING_ARTIFACTS_DIR = "pvp/artifacts/rankings"
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+_version = None
+_modified = 0.0
+_checked = 0.0
+_version_lock = threading.Lock()
+_caches = {}
+
+
+def _stat_tree(path, digest, suffixes) -> float:
+    """Feed the stat info of the ``suffixes`` files under ``path`` to ``digest``; returns the newest mtime."""
+    try:
+        entries = sorted(os.scandir(path), key=lambda e: e.name)
+    except FileNotFoundError:
+        return 0.0
+    newest = 0.0
+    for entry in entries:
+        if entry.is_dir():
+            newest = max(newest, _stat_tree(entry.path, digest, suffixes))
+        elif entry.name.endswith(suffixes):
+            stat = entry.stat()
+            digest.update(f"{entry.path}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+            newest = max(newest, stat.st_mtime)
+    return newest
+
+
+def _scan():
+    digest = hashlib.sha1()
+    newest = max(_stat_tree(FIXTURES_DIR, digest, ".json"), _stat_tree(RANKING_ARTIFACTS_DIR, digest, ".bin"))
+    return digest.hexdigest()[:12], newest
+
+
+def fixture_stamp() -> str:
+    return _scan()[0]
+
+
+def data_version() -> str:
+    """Stamp of the loaded data: the loaders' DB counter plus the fixture files on disk.
+
+    It is recomputed at most every ``DATA_VERSION_TTL`` seconds per process.
+    """
+    global _version, _modified, _checked
+    now = time.monotonic()
+    if _version is not None and now - _checked < getattr(settings, "DATA_VERSION_TTL", 5):
+        return _version
+    with _version_lock:
+        if _version is None or now - _checked >= getattr(settings, "DATA_VERSION_TTL", 5):
+            from pvp.models import DataVersion
+            counter, updated = DataVersion.state()
+            stamp, newest = _scan()
+            _version = f"{counter}-{stamp}"
+            _modified = max(newest, updated.timestamp() if updated else 0.0)
+            _checked = now
+    return _version
+
+
+def data_last_modified() -> int:
+    """Unix time of the newest data: the last loader run or fixture/artifact change."""
+    data_version()
+    return int(_modified)
+
+
+def expire_data_version():
+    """Force the next data_version() call to look at the database and fixtures again."""
+    global _version
+    _version = None
+
+
+def _freeze(value):
+    # lists (e.g. a ranking moveset) are hashed by content
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class VersionedCache:
+    """Bounded LRU memoization that is dropped whenever the data version changes."""
+
+    def __init__(self, func, maxsize):
+        update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        _caches[f"{func.__module__}.{func.__qualname__}"] = self
+
+    def __call__(self, *args, **kwargs):
+        version = data_version()
+        key = (_freeze(args), _freeze(kwargs)) if kwargs else _freeze(args)
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                cache_lookup(True)
+                return self.entries[key]
+            self.misses += 1
+        cache_lookup(False)
+        value = self.func(*args, **kwargs)
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = value
+                if len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return value
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
+
+    def cache_clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+def versioned_cache(maxsize=1024):
+    def decorator(func):
+        return VersionedCache(func, maxsize)
+    return decorator
+
+
+def cache_stats():
+    return {name: cache.cache_info()._asdict() for name, cache in _caches.items()}
+
+
+def clear_caches():
+    """Empty every versioned cache, e.g. to measure cold paths."""
+    for cache in _caches.values():
+        cache.cache_clear()
@@ -0,0 +1,220 @@
+"""Turn-based 1v1 PvP battle simulation.
+
+A battle runs in 0.5s turns. Each turn, charged moves resolve first in
+order of attack (ties fire together), then fast moves advance and deal
+their damage on their last turn. All damage is read from tables built
+with NumPy for every move and attack/defense buff stage combination, so
+the turn loop itself is integer bookkeeping only.
+"""
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from pvp.cache import versioned_cache
+from pvp.engine.stats import compute_stats, default_ivs
+from pvp.engine.typechart import multipliers, type_index
+
+BONUS_MULTIPLIER = 1.2999999523162842
+STAB_MULTIPLIER = 1.2
+MAX_ENERGY = 100
+TURN_LIMIT = 480  # four minutes
+
+
+@dataclass(frozen=True)
+class BattleSettings:
+    max_buff_stages: int = 4
+    buff_divisor: int = 4
+    shadow_atk_mult: float = 1.2
+    shadow_def_mult: float = 0.83333331
+
+    @classmethod
+    def from_gamemaster(cls, settings):
+        return cls(
+            max_buff_stages=settings["maxBuffStages"],
+            buff_divisor=settings["buffDivisor"],
+            shadow_atk_mult=settings["shadowAtkMult"],
+            shadow_def_mult=settings["shadowDefMult"],
+        )
+
+    def buff_multipliers(self) -> np.ndarray:
+        """Stat multiplier for every buff stage from -max_buff_stages to +max_buff_stages."""
+        stages = np.arange(-self.max_buff_stages, self.max_buff_stages + 1)
+        boost = (self.buff_divisor + np.maximum(stages, 0)) / self.buff_divisor
+        drop = self.buff_divisor / (self.buff_divisor - np.minimum(stages, 0))
+        return boost * drop
+
+
+@versioned_cache(maxsize=1)
+def gamemaster_settings() -> BattleSettings:
+    from pvp.loaders import open_fixture
+    return BattleSettings.from_gamemaster(open_fixture("gamemaster.json")["settings"])
+
+
+class Combatant:
+    """A species with a moveset, level and IVs, and its stats for battle."""
+
+    def __init__(self, species, fast_move, charged_moves, cp=1500, ivs=None, settings=None):
+        settings = settings or gamemaster_settings()
+        self.species = species
+        self.fast_move = fast_move
+        self.charged_moves = tuple(charged_moves)[:2]
+        self.level, *self.ivs = ivs or default_ivs(species, cp)
+        self.atk, self.defense, self.hp = compute_stats(species.base_stats, self.ivs, self.level)
+        if species.is_shadow:
+            self.atk *= settings.shadow_atk_mult
+            self.defense *= settings.shadow_def_mult
+
+    @property
+    def moves(self):
+        return (self.fast_move,) + self.charged_moves
+
+
+def damage_table(attacker: Combatant, defender: Combatant, settings: BattleSettings) -> np.ndarray:
+    """Damage of each attacker move for every (attack stage, defense stage) pair.
+
+    Shape is (moves, stages, stages) with the fast move first.
+    """
+    moves = attacker.moves
+    power = np.array([m.power for m in moves], dtype=np.float64)
+    stab = np.array([STAB_MULTIPLIER if m.type in attacker.species.types else 1.0 for m in moves])
+    defender_types = [type_index(t) for t in (list(defender.species.types) + ["none"])[:2]]
+    eff = multipliers(np.array([type_index(m.type) for m in moves]), defender_types)
+    buff = settings.buff_multipliers()
+    ratio = (attacker.atk * buff)[:, None] / (defender.defense * buff)[None, :]
+    base = power * stab * eff * 0.5 * BONUS_MULTIPLIER
+    return (np.floor(base[:, None, None] * ratio[None, :, :]) + 1).astype(np.int32)
+
+
+def buff_effects(move, settings: BattleSettings):
+    """(self atk, self def, opponent atk, opponent def) stage changes of a charged move.
+
+    Only guaranteed buffs are applied, like pvpoke does outside of random mode.
+    """
+    if not move.buffs or (move.buff_apply_chance or 0) < 1:
+        return None
+    if move.buff_target == "both":
+        return tuple(move.buff_self or (0, 0)) + tuple(move.buff_opponent or (0, 0))
+    if move.buff_target == "self":
+        return (move.buffs[0], move.buffs[1], 0, 0)
+    return (0, 0, move.buffs[0], move.buffs[1])
+
+
+def battle_rating(hp_left, max_hp, opponent_hp_left, opponent_max_hp) -> int:
+    return math.floor(500 * (opponent_max_hp - max(opponent_hp_left, 0)) / opponent_max_hp
+                      + 500 * max(hp_left, 0) / max_hp)
+
+
+def start_energy(combatant: Combatant, fast_moves: int) -> int:
+    """Energy after ``fast_moves`` uses of the fast move, as in the ranking scenarios."""
+    return min(combatant.fast_move.energy_gain * fast_moves, MAX_ENERGY)
+
+
+@dataclass
+class BattleResult:
+    ratings: tuple
+    turns: int
+    hp: tuple
+    energy: tuple
+    shields: tuple
+    timeline: list = field(default_factory=list)
+
+    @property
+    def winner(self):
+        if self.ratings[0] == self.ratings[1]:
+            return None
+        return 0 if self.ratings[0] > self.ratings[1] else 1
+
+
+def simulate(a: Combatant, b: Combatant, shields=(1, 1), energy=(0, 0), settings=None, timeline=False) -> BattleResult:
+    settings = settings or gamemaster_settings()
+    fighters = (a, b)
+    offset = settings.max_buff_stages
+    tables = (damage_table(a, b, settings).tolist(), damage_table(b, a, settings).tolist())
+    costs = tuple([m.energy for m in f.charged_moves] for f in fighters)
+    effects = tuple([buff_effects(m, settings) for m in f.charged_moves] for f in fighters)
+    fast_turns = tuple(max(int(f.fast_move.turns), 1) for f in fighters)
+    fast_energy = tuple(f.fast_move.energy_gain for f in fighters)
+    # move to build up to once shields are gone: best damage per energy at neutral stages
+    nuke = tuple(
+        max(range(len(costs[s])), key=lambda i: tables[s][i + 1][offset][offset] / costs[s][i]) if costs[s] else None
+        for s in (0, 1)
+    )
+    cheapest = tuple(min(range(len(costs[s])), key=lambda i: costs[s][i]) if costs[s] else None for s in (0, 1))
+    if a.atk == b.atk:
+        order = (0, 1)
+    else:
+        order = (0, 1) if a.atk > b.atk else (1, 0)
+
+    hp = [a.hp, b.hp]
+    en = [start_energy(a, energy[0]), start_energy(b, energy[1])]
+    sh = list(shields)
+    cooldown = [0, 0]
+    atk_stage = [0, 0]
+    def_stage = [0, 0]
+    events = [] if timeline else None
+    limit = settings.max_buff_stages
+
+    def choose(side):
+        opp = 1 - side
+        options = [i for i, c in enumerate(costs[side]) if c <= en[side]]
+        if not options:
+            return None
+        if sh[opp] > 0:
+            return cheapest[side] if cheapest[side] in options else None
+        table = tables[side]
+        for i in sorted(options, key=lambda i: costs[side][i]):
+            if table[i + 1][atk_stage[side] + offset][def_stage[opp] + offset] >= hp[opp]:
+                return i
+        return nuke[side] if nuke[side] in options else None
+
+    turn = 0
+    while turn < TURN_LIMIT and hp[0] > 0 and hp[1] > 0:
+        actions = [choose(s) if cooldown[s] == 0 else None for s in (0, 1)]
+        tie = actions[0] is not None and actions[1] is not None and a.atk == b.atk
+        for side in order:
+            move = actions[side]
+            if move is None or (hp[side] <= 0 and not tie):
+                continue
+            opp = 1 - side
+            en[side] -= costs[side][move]
+            shielded = sh[opp] > 0
+            if shielded:
+                sh[opp] -= 1
+                damage = 1
+            else:
+                damage = tables[side][move + 1][atk_stage[side] + offset][def_stage[opp] + offset]
+            hp[opp] -= damage
+            effect = effects[side][move]
+            if effect:
+                atk_stage[side] = max(-limit, min(limit, atk_stage[side] + effect[0]))
+                def_stage[side] = max(-limit, min(limit, def_stage[side] + effect[1]))
+                atk_stage[opp] = max(-limit, min(limit, atk_stage[opp] + effect[2]))
+                def_stage[opp] = max(-limit, min(limit, def_stage[opp] + effect[3]))
+            if events is not None:
+                events.append((turn, side, fighters[side].charged_moves[move].name, damage, shielded))
+
+        landed = [0, 0]
+        for side in (0, 1):
+            if hp[side] <= 0:
+                continue
+            if cooldown[side] == 0 and actions[side] is None:
+                cooldown[side] = fast_turns[side]
+            if cooldown[side] > 0:
+                cooldown[side] -= 1
+                if cooldown[side] == 0:
+                    opp = 1 - side
+                    landed[side] = tables[side][0][atk_stage[side] + offset][def_stage[opp] + offset]
+        for side in (0, 1):
+            if landed[side]:
+                hp[1 - side] -= landed[side]
+                en[side] = min(en[side] + fast_energy[side], MAX_ENERGY)
+                if events is not None:
+                    events.append((turn, side, fighters[side].fast_move.name, landed[side], False))
+        turn += 1
+
+    ratings = (
+        battle_rating(hp[0], a.hp, hp[1], b.hp),
+        battle_rating(hp[1], b.hp, hp[0], a.hp),
+    )
+    return BattleResult(ratings, turn, (max(hp[0], 0), max(hp[1], 0)), tuple(en), tuple(sh), events or [])
@@ -0,0 +1,148 @@
+"""Cup eligibility over column arrays of every species.
+
+The species attributes the cup filters look at (types, tags, dex,
+evolution stage, species id) are laid out once as arrays. A cup's
+``include``/``exclude`` filters compile to boolean mask operations on
+them, so evaluating a cup is a handful of vectorized ops. CupIndex keeps
+the result for every gamemaster cup and league as packed bitmaps, with a
+per-species reverse lookup of the (cup, cp) pairs it is legal in.
+"""
+import numpy as np
+
+from pvp.engine.stats import compute_cp, default_ivs
+from pvp.engine.typechart import TYPES, type_index
+
+LEAGUES = (500, 1500, 2500, 10000)
+# species that can't get close to the CP cap aren't ranked; Master League has no cap to get close to
+MIN_CP_RATIO = 0.7
+MASTER_MIN_CP = 2000
+
+
+def min_cp(cp) -> float:
+    cp = int(cp)
+    return MASTER_MIN_CP if cp >= 10000 else cp * MIN_CP_RATIO
+
+
+class SpeciesColumns:
+    """Struct of arrays over the species of a registry, in registry order."""
+
+    def __init__(self, species):
+        self.records = list(species.values())
+        self.ids = np.array(list(species), dtype=object)
+        self.index = {s: i for i, s in enumerate(species)}
+        n = len(self.records)
+        self.none = np.zeros(n, dtype=bool)
+        self.types = np.zeros((n, len(TYPES) + 1), dtype=bool)
+        tags = sorted({t for r in self.records for t in r.tags})
+        self.tag_index = {t: i for i, t in enumerate(tags)}
+        self.tags = np.zeros((n, len(tags)), dtype=bool)
+        for i, r in enumerate(self.records):
+            self.types[i, [type_index(t) for t in r.types]] = True
+            self.tags[i, [self.tag_index[t] for t in r.tags]] = True
+        self.dex = np.array([r.dex for r in self.records], dtype=np.int32)
+        self.playable = np.array([bool(r.released and r.fast_moves and r.charged_moves) for r in self.records], dtype=bool)
+        families = [r.family or {} for r in self.records]
+        self.evolves = np.array([bool(f.get("evolutions")) for f in families], dtype=bool)
+        # 1: first stage of a family, 2: middle stage
+        self.stage = np.array([2 if f.get("parent") else 1 for f in families], dtype=np.int8)
+        self.order = np.argsort(self.ids.astype(str), kind="stable")
+        self._reaches = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def tag_mask(self, values) -> np.ndarray:
+        columns = [self.tag_index[v.lower()] for v in values if v.lower() in self.tag_index]
+        return self.tags[:, columns].any(axis=1)
+
+    def id_mask(self, values) -> np.ndarray:
+        mask = self.none.copy()
+        mask[[self.index[v] for v in values if v in self.index]] = True
+        return mask
+
+    def reaches(self, cp) -> np.ndarray:
+        """Species whose ranking IVs get within reach of the CP cap."""
+        cp = int(cp)
+        if cp not in self._reaches:
+            floor = min_cp(cp)
+            reaches = np.zeros(len(self), dtype=bool)
+            for i, r in enumerate(self.records):
+                level, *ivs = default_ivs(r, cp)
+                reaches[i] = compute_cp(r.base_stats, ivs, level) >= floor
+            self._reaches[cp] = reaches
+        return self._reaches[cp]
+
+    def pool(self, mask) -> list:
+        """Species ids of ``mask``, sorted."""
+        return list(self.ids[self.order[mask[self.order]]])
+
+
+def compile_filter(filter):
+    """(columns, cp) -> mask of the species a gamemaster cup filter matches."""
+    kind, values = filter["filterType"], filter["values"]
+    if kind == "tag":
+        return lambda c, cp: c.tag_mask(values)
+    if kind == "type":
+        types = [type_index(v) for v in values]
+        return lambda c, cp: c.types[:, types].any(axis=1)
+    if kind == "id":
+        leagues = filter.get("leagues")
+        return lambda c, cp: c.id_mask(values) if leagues is None or int(cp) in leagues else c.none
+    if kind == "dex":
+        low, high = min(values), max(values)
+        return lambda c, cp: (c.dex >= low) & (c.dex <= high)
+    if kind == "evolution":
+        stages = np.array(values)
+        return lambda c, cp: c.evolves & np.isin(c.stage, stages)
+    return lambda c, cp: c.none
+
+
+class CompiledCup:
+    def __init__(self, cup):
+        self.name = cup["name"]
+        include = cup.get("include", [])
+        # an id include adds species regardless of the other filters
+        self.added = [compile_filter(f) for f in include if f["filterType"] == "id"]
+        self.include = [compile_filter(f) for f in include if f["filterType"] != "id"]
+        self.exclude = [compile_filter(f) for f in cup.get("exclude", [])]
+
+    def mask(self, columns, cp) -> np.ndarray:
+        mask = columns.playable.copy()
+        for f in self.include:
+            mask &= f(columns, cp)
+        for f in self.added:
+            mask |= f(columns, cp) & columns.playable
+        for f in self.exclude:
+            mask &= ~f(columns, cp)
+        return mask
+
+
+class CupIndex:
+    """Eligibility bitmaps of every cup in every league."""
+
+    def __init__(self, columns, cups, leagues=LEAGUES):
+        self.columns = columns
+        self.cups = {cup["name"]: CompiledCup(cup) for cup in cups}
+        self.keys = [(name, cp) for name in self.cups for cp in leagues]
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        masks = np.array([self.cups[name].mask(columns, cp) for name, cp in self.keys], dtype=bool)
+        self.bitmaps = np.packbits(masks, axis=1)
+
+    def eligible(self, cup, cp) -> np.ndarray:
+        """Mask of the species legal in ``cup`` (a gamemaster cup name or a cup definition)."""
+        if isinstance(cup, dict):
+            return CompiledCup(cup).mask(self.columns, cp)
+        row = self.rows.get((cup, int(cp)))
+        if row is None:
+            return self.cups[cup].mask(self.columns, cp)
+        return np.unpackbits(self.bitmaps[row], count=len(self.columns)).astype(bool)
+
+    def pool(self, cup, cp) -> list:
+        """Sorted species ids ranked in ``cup``: legal and within reach of the CP cap."""
+        return self.columns.pool(self.eligible(cup, cp) & self.columns.reaches(cp))
+
+    def cups_for(self, species_id) -> list:
+        """(cup, cp) pairs that ``species_id`` is legal in."""
+        i = self.columns.index[species_id]
+        bits = (self.bitmaps[:, i >> 3] >> (7 - (i & 7))) & 1
+        return [self.keys[k] for k in np.nonzero(bits)[0]]
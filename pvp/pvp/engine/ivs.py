@@ -0,0 +1,183 @@
+"""Stat product rankings of every IV combination per league.
+
+For each species and CP cap, all 16 * 16 * 16 IV spreads are taken to the
+highest half level that stays under the cap and ranked by stat product
+(attack * defense * floored hp). The whole species list is evaluated at
+once: the level bound of each (species, IVs) row comes from a
+searchsorted over CPM^2 and is then corrected against the exact CP
+formula, so no (IVs, level) grid is ever materialized.
+
+Tables are built offline by ``manage.py build_artifacts``, saved as .npy
+files per cap and opened memory-mapped and read-only, so a lookup is an
+index into a row.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from pvp.cache import versioned_cache
+from pvp.engine.stats import CPM, LEVELS
+
+logger = logging.getLogger(__name__)
+
+IV_TABLES_DIR = Path("pvp/artifacts/ivs")
+LEAGUES = [500, 1500, 2500, 10000]
+MAX_LEVEL = 50
+COMBINATIONS = 16 ** 3
+
+# IV spread of every combination index: index = atk * 256 + def * 16 + hp
+IVS = np.stack(np.meshgrid(np.arange(16), np.arange(16), np.arange(16), indexing="ij"), axis=-1).reshape(-1, 3)
+ARRAYS = ("rank", "level", "cp", "product", "order")
+
+
+def iv_index(atk, defense, hp) -> int:
+    return int(atk) * 256 + int(defense) * 16 + int(hp)
+
+
+def _cp(atk, defense, hp, m):
+    # same operation order as stats.compute_cp so results match it exactly
+    return np.maximum(np.floor(atk * np.sqrt(defense) * np.sqrt(hp) * m * m / 10), 10)
+
+
+def rank_ivs(base_stats, cap, max_level=MAX_LEVEL) -> dict:
+    """Rank tables for an (S, 3) array of base (atk, def, hp); every array has shape (S, 4096)."""
+    base = np.asarray(base_stats, dtype=np.float64)[:, None, :] + IVS[None, :, :]
+    atk, defense, hp = base[..., 0], base[..., 1], base[..., 2]
+    top = int(np.searchsorted(LEVELS, max_level, side="right")) - 1
+    cpm = np.asarray(CPM[:top + 1], dtype=np.float64)
+
+    # largest level index with CP <= cap, from CP < cap + 1 solved for cpm^2, then checked exactly
+    bound = 10 * (cap + 1) / (atk * np.sqrt(defense) * np.sqrt(hp))
+    level = np.clip(np.searchsorted(cpm * cpm, bound, side="left") - 1, 0, top)
+    up = np.minimum(level + 1, top)
+    level = np.where((up > level) & (_cp(atk, defense, hp, cpm[up]) <= cap), up, level)
+    down = np.maximum(level - 1, 0)
+    level = np.where((level > 0) & (_cp(atk, defense, hp, cpm[level]) > cap), down, level)
+
+    m = cpm[level]
+    cp = _cp(atk, defense, hp, m)
+    product = (atk * m) * (defense * m) * np.maximum(np.floor(hp * m), 10)
+    # spreads that can't get under the cap even at level 1 rank last
+    product = np.where(cp <= cap, product, 0)
+    order = np.lexsort((np.arange(COMBINATIONS)[None, :].repeat(len(base), 0), -atk, -product), axis=-1)
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(1, COMBINATIONS + 1)[None, :], axis=-1)
+    return {
+        "rank": rank.astype(np.uint16),
+        "level": level.astype(np.uint8),
+        "cp": cp.astype(np.uint16),
+        "product": (product / 1000).astype(np.float32),
+        "order": order.astype(np.uint16),
+    }
+
+
+class IVTable:
+    """Memory-mapped rank tables of one CP cap."""
+
+    def __init__(self, directory):
+        with open(Path(directory) / "species.json") as file:
+            meta = json.load(file)
+        self.digest = meta["digest"]
+        self.cap = meta["cap"]
+        self.index = {species_id: i for i, species_id in enumerate(meta["species"])}
+        for name in ARRAYS:
+            setattr(self, name, np.load(Path(directory) / f"{name}.npy", mmap_mode="r"))
+
+    def __contains__(self, species_id):
+        return species_id in self.index
+
+    def entry(self, species_id, ivs) -> dict:
+        row = self.index[species_id]
+        i = iv_index(*ivs)
+        return {
+            "ivs": [int(v) for v in IVS[i]],
+            "rank": int(self.rank[row, i]),
+            "level": float(LEVELS[self.level[row, i]]),
+            "cp": int(self.cp[row, i]),
+            "product": round(float(self.product[row, i]), 1),
+        }
+
+    def rank_of(self, species_id, ivs) -> int:
+        return int(self.rank[self.index[species_id], iv_index(*ivs)])
+
+    def top(self, species_id, n=1) -> list:
+        row = self.index[species_id]
+        return [self.entry(species_id, IVS[i]) for i in self.order[row, :n]]
+
+
+def _digest(species, cap, max_level):
+    digest = hashlib.sha1(f"{cap}:{max_level};".encode())
+    for s in species:
+        digest.update(f"{s.species_id}:{s.base_stats['atk']},{s.base_stats['def']},{s.base_stats['hp']};".encode())
+    return digest.hexdigest()
+
+
+def build_table(species, cap, directory=IV_TABLES_DIR, max_level=MAX_LEVEL) -> Path:
+    target = Path(directory) / str(cap)
+    target.mkdir(parents=True, exist_ok=True)
+    tables = rank_ivs([[s.base_stats["atk"], s.base_stats["def"], s.base_stats["hp"]] for s in species], cap, max_level)
+    # replaced, not rewritten in place: running servers keep their mapping of the old files
+    for name, array in tables.items():
+        tmp = target / f"{name}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as file:
+            np.save(file, array)
+        os.replace(tmp, target / f"{name}.npy")
+    meta = {"cap": cap, "digest": _digest(species, cap, max_level), "species": [s.species_id for s in species]}
+    # written last: a table without an up to date species.json isn't opened
+    tmp = target / f"species.{os.getpid()}.tmp"
+    with open(tmp, "w") as file:
+        json.dump(meta, file)
+    os.replace(tmp, target / "species.json")
+    return target
+
+
+def _species():
+    from pvp.registry import get_registry
+    return sorted(get_registry().species.values(), key=lambda s: s.species_id)
+
+
+def open_table(cap, directory=IV_TABLES_DIR, species=None):
+    """The saved rank tables for ``cap`` if they match the current species and base stats, else None."""
+    species = _species() if species is None else species
+    try:
+        table = IVTable(Path(directory) / str(cap))
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+    return table if table.digest == _digest(species, int(cap), MAX_LEVEL) else None
+
+
+def build_tables(caps=LEAGUES, directory=IV_TABLES_DIR, force=False) -> list:
+    """Build the rank tables of ``caps`` that are missing or out of date; returns their directories."""
+    species = _species()
+    return [build_table(species, int(cap), directory) for cap in caps
+            if force or open_table(cap, directory, species) is None]
+
+
+@versioned_cache(maxsize=2 * len(LEAGUES))
+def _get_table(cap, directory, mtime):
+    table = open_table(cap, directory)
+    if table is None:
+        logger.warning("IV tables for %s are missing or out of date, run manage.py build_artifacts", cap)
+    return table
+
+
+def get_table(cap, directory=IV_TABLES_DIR):
+    """Rank tables for ``cap``; None until build_artifacts has built them for the current species."""
+    # the tables aren't part of the data version; keyed on species.json (written last) a rebuild is picked up
+    try:
+        mtime = (Path(directory) / str(cap) / "species.json").stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    return _get_table(int(cap), Path(directory), mtime)
+
+
+def iv_rank(species_id, cp, ivs) -> int:
+    """Stat product rank (1 is best) of ``ivs`` = (atk, def, hp) for a species in the ``cp`` league."""
+    table = get_table(int(cp))
+    if table is None:
+        raise LookupError(f"No IV tables for {cp}")
+    return table.rank_of(species_id, ivs)
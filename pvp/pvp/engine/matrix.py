@@ -0,0 +1,203 @@
+"""All-vs-all battle ratings, simulated in NumPy batches of pairs.
+
+This runs the same rules as ``pvp.engine.battle.simulate`` with every
+piece of battle state held in arrays over pairs, so a whole chunk of
+battles advances one turn per set of array operations. Finished battles
+are dropped from the working set as they end.
+"""
+import numpy as np
+
+from pvp.engine.battle import (BONUS_MULTIPLIER, MAX_ENERGY, STAB_MULTIPLIER, TURN_LIMIT, BattleSettings,
+                               buff_effects, gamemaster_settings)
+from pvp.engine.typechart import NO_TYPE, multipliers, type_index
+
+UNAFFORDABLE = 10 ** 6
+CHUNK_SIZE = 200_000
+
+
+class Roster:
+    """Struct of arrays over a list of combatants."""
+
+    def __init__(self, combatants):
+        n = len(combatants)
+        self.combatants = combatants
+        self.atk = np.array([c.atk for c in combatants], dtype=np.float64)
+        self.defense = np.array([c.defense for c in combatants], dtype=np.float64)
+        self.hp = np.array([c.hp for c in combatants], dtype=np.int64)
+        self.types = np.array([[type_index(t) for t in (list(c.species.types) + ["none"])[:2]] for c in combatants], dtype=np.int64).reshape(n, 2)
+        # moves: fast move first, then up to two charged moves
+        self.power_stab = np.zeros((n, 3))
+        self.move_type = np.full((n, 3), NO_TYPE, dtype=np.int64)
+        self.cost = np.full((n, 2), UNAFFORDABLE, dtype=np.int64)
+        self.effect = np.zeros((n, 2, 4), dtype=np.int64)
+        self.turns = np.array([max(int(c.fast_move.turns), 1) for c in combatants], dtype=np.int64)
+        self.gain = np.array([c.fast_move.energy_gain for c in combatants], dtype=np.int64)
+        for i, c in enumerate(combatants):
+            for k, move in enumerate(c.moves):
+                self.power_stab[i, k] = move.power * (STAB_MULTIPLIER if move.type in c.species.types else 1.0)
+                self.move_type[i, k] = type_index(move.type)
+            for k, move in enumerate(c.charged_moves):
+                self.cost[i, k] = move.energy
+                effect = buff_effects(move, gamemaster_settings())
+                if effect:
+                    self.effect[i, k] = effect
+
+    def __len__(self):
+        return len(self.combatants)
+
+
+class PairBatch:
+    """Battle state for a batch of (side 0, side 1) roster index pairs."""
+
+    def __init__(self, roster: Roster, first, second, shields, energy, settings: BattleSettings):
+        self.offset = settings.max_buff_stages
+        self.buff = settings.buff_multipliers()
+        self.index = np.arange(len(first))
+        sides = np.stack([first, second], axis=1)
+        opponents = sides[:, ::-1]
+        self.atk = roster.atk[sides]
+        self.defense = roster.defense[sides]
+        self.max_hp = roster.hp[sides]
+        defender_types = roster.types[opponents]
+        move_types = roster.move_type[sides]
+        eff = multipliers(move_types, defender_types[:, :, None, :])
+        self.base = roster.power_stab[sides] * eff * 0.5 * BONUS_MULTIPLIER
+        self.cost = roster.cost[sides]
+        self.effect = roster.effect[sides]
+        self.turns = roster.turns[sides]
+        self.gain = roster.gain[sides]
+        self.cmp_first = np.where(self.atk[:, 0] >= self.atk[:, 1], 0, 1)
+        self.atk_tie = self.atk[:, 0] == self.atk[:, 1]
+
+        n = len(first)
+        self.hp = self.max_hp.copy()
+        self.energy = np.minimum(self.gain * np.asarray(energy), MAX_ENERGY)
+        self.shields = np.tile(np.asarray(shields, dtype=np.int64), (n, 1))
+        self.cooldown = np.zeros((n, 2), dtype=np.int64)
+        self.atk_stage = np.zeros((n, 2), dtype=np.int64)
+        self.def_stage = np.zeros((n, 2), dtype=np.int64)
+
+        neutral = np.stack([self.damage(self.index, s, 1 - s, k) for k in (1, 2) for s in (0, 1)], axis=1).reshape(n, 2, 2).transpose(0, 2, 1)
+        self.cheapest = np.where(self.cost[:, :, 1] < self.cost[:, :, 0], 1, 0)
+        value = neutral / self.cost
+        self.nuke = np.where(value[:, :, 1] > value[:, :, 0], 1, 0)
+
+    def damage(self, rows, side, opp, move):
+        ratio = (self.atk[rows, side] * self.buff[self.atk_stage[rows, side] + self.offset]) / (
+            self.defense[rows, opp] * self.buff[self.def_stage[rows, opp] + self.offset])
+        return np.floor(self.base[rows, side, move] * ratio).astype(np.int64) + 1
+
+    def choose(self, side):
+        rows = self.index
+        opp = 1 - side
+        free = self.cooldown[:, side] == 0
+        affordable = free[:, None] & (self.cost[:, side] <= self.energy[:, side, None])
+        cheap = self.cheapest[:, side]
+        other = 1 - cheap
+        nuke = self.nuke[:, side]
+        damage = np.stack([self.damage(rows, side, opp, 1), self.damage(rows, side, opp, 2)], axis=1)
+        ko = affordable & (damage >= self.hp[:, opp, None])
+        open_action = np.where(ko[rows, cheap], cheap,
+                               np.where(ko[rows, other], other,
+                                        np.where(affordable[rows, nuke], nuke, -1)))
+        bait_action = np.where(affordable[rows, cheap], cheap, -1)
+        return np.where(self.shields[:, opp] > 0, bait_action, open_action)
+
+    def fire(self, actions, first_pass):
+        side = self.cmp_first if first_pass else 1 - self.cmp_first
+        move = actions[self.index, side]
+        alive = self.hp[self.index, side] > 0
+        both = (actions[:, 0] >= 0) & (actions[:, 1] >= 0) & self.atk_tie
+        rows = np.nonzero((move >= 0) & (alive | both))[0]
+        if not len(rows):
+            return
+        side = side[rows]
+        opp = 1 - side
+        move = move[rows]
+        self.energy[rows, side] -= self.cost[rows, side, move]
+        shielded = self.shields[rows, opp] > 0
+        self.shields[rows, opp] -= shielded
+        damage = np.where(shielded, 1, self.damage(rows, side, opp, move + 1))
+        self.hp[rows, opp] -= damage
+        effect = self.effect[rows, side, move]
+        limit = self.offset
+        self.atk_stage[rows, side] = np.clip(self.atk_stage[rows, side] + effect[:, 0], -limit, limit)
+        self.def_stage[rows, side] = np.clip(self.def_stage[rows, side] + effect[:, 1], -limit, limit)
+        self.atk_stage[rows, opp] = np.clip(self.atk_stage[rows, opp] + effect[:, 2], -limit, limit)
+        self.def_stage[rows, opp] = np.clip(self.def_stage[rows, opp] + effect[:, 3], -limit, limit)
+
+    def step(self):
+        actions = np.stack([self.choose(0), self.choose(1)], axis=1)
+        self.fire(actions, True)
+        self.fire(actions, False)
+
+        alive = self.hp > 0
+        start = alive & (self.cooldown == 0) & (actions < 0)
+        self.cooldown = np.where(start, self.turns, self.cooldown)
+        running = alive & (self.cooldown > 0)
+        self.cooldown -= running
+        lands = running & (self.cooldown == 0)
+        landed = np.stack([
+            np.where(lands[:, s], self.damage(self.index, s, 1 - s, np.zeros_like(self.index)), 0) for s in (0, 1)
+        ], axis=1)
+        self.hp -= landed[:, ::-1]
+        self.energy = np.where(lands, np.minimum(self.energy + self.gain, MAX_ENERGY), self.energy)
+
+    def keep(self, mask):
+        for name in ("atk", "defense", "max_hp", "base", "cost", "effect", "turns", "gain", "cmp_first", "atk_tie",
+                     "hp", "energy", "shields", "cooldown", "atk_stage", "def_stage", "cheapest", "nuke"):
+            setattr(self, name, getattr(self, name)[mask])
+        self.index = np.arange(int(mask.sum()))
+
+
+def ratings(hp, max_hp):
+    """Battle ratings of both sides from remaining and max hp arrays of shape (n, 2)."""
+    left = np.maximum(hp, 0)
+    return np.floor(500 * (max_hp[:, ::-1] - left[:, ::-1]) / max_hp[:, ::-1] + 500 * left / max_hp).astype(np.int16)
+
+
+def simulate_pairs(roster: Roster, first, second, shields=(1, 1), energy=(0, 0), settings=None):
+    """Ratings of shape (n, 2) for battles between roster[first[k]] and roster[second[k]]."""
+    settings = settings or gamemaster_settings()
+    batch = PairBatch(roster, np.asarray(first), np.asarray(second), shields, energy, settings)
+    result = np.zeros((len(first), 2), dtype=np.int16)
+    position = np.arange(len(first))
+    turn = 0
+    while len(position):
+        batch.step()
+        turn += 1
+        done = (batch.hp[:, 0] <= 0) | (batch.hp[:, 1] <= 0) | (turn >= TURN_LIMIT)
+        if done.any():
+            result[position[done]] = ratings(batch.hp[done], batch.max_hp[done])
+            batch.keep(~done)
+            position = position[~done]
+    return result
+
+
+def rating_matrix(roster: Roster, shields=(1, 1), energy=(0, 0), settings=None, chunk_size=CHUNK_SIZE, pairs=None):
+    """Matrix M[i, j] with the rating of roster[i] against roster[j]; mirrors are 500.
+
+    ``pairs`` optionally restricts the work to a slice of the pair list, which
+    ``pair_list`` produces in a fixed order.
+    """
+    n = len(roster)
+    matrix = np.full((n, n), 500, dtype=np.int16)
+    first, second, symmetric = pair_list(n, shields, energy) if pairs is None else pairs
+    for start in range(0, len(first), chunk_size):
+        a = first[start:start + chunk_size]
+        b = second[start:start + chunk_size]
+        result = simulate_pairs(roster, a, b, shields, energy, settings)
+        matrix[a, b] = result[:, 0]
+        if symmetric:
+            matrix[b, a] = result[:, 1]
+    return matrix
+
+
+def pair_list(n, shields, energy):
+    """Ordered pairs to simulate; symmetric scenarios only need each unordered pair once."""
+    symmetric = shields[0] == shields[1] and energy[0] == energy[1]
+    if symmetric:
+        first, second = np.triu_indices(n, k=1)
+    else:
+        first, second = np.nonzero(~np.eye(n, dtype=bool))
+    return first, second, symmetric
@@ -0,0 +1,42 @@
+"""Fast move counts for every fast × charged move pair.
+
+The k-th charged move of a cycle that starts at zero energy is reached after
+ceil(k·E/g) fast moves in total, so it needs ceil(k·E/g) - ceil((k-1)·E/g)
+of them on its own (E the charged move's cost, g the fast move's gain).
+"""
+import numpy as np
+
+CYCLES = 3
+
+
+class MoveCounts:
+    def __init__(self, fast_moves, charged_moves):
+        self.fast_index = {m: i for i, m in enumerate(fast_moves)}
+        self.charged_index = {m: i for i, m in enumerate(charged_moves)}
+        gain = np.array([m.energy_gain for m in fast_moves.values()], dtype=np.int64)
+        energy = np.array([m.energy for m in charged_moves.values()], dtype=np.int64)
+        k = np.arange(CYCLES + 1, dtype=np.int64)
+        needed = energy[None, :, None] * k[None, None, :]
+        safe_gain = np.maximum(gain, 1)[:, None, None]
+        # ceiling division in integers; moves without energy gain never get there
+        total = -(-needed // safe_gain)
+        counts = np.diff(total, axis=2)
+        counts[gain <= 0] = 0
+        # counts[f, c, k]: fast moves f needed for the (k+1)-th charged move c
+        self.counts = counts.astype(np.int16)
+
+    def __call__(self, fast_move, charged_move) -> tuple:
+        return tuple(int(n) for n in self.counts[self.fast_index[fast_move], self.charged_index[charged_move]])
+
+    def first(self, fast_move, charged_move) -> int:
+        return int(self.counts[self.fast_index[fast_move], self.charged_index[charged_move], 0])
+
+    def suffix(self, fast_move, charged_move) -> str:
+        """Count label of the rankings: "-" when later moves need fewer fast moves, "." when only the third does."""
+        first, second, third = self(fast_move, charged_move)
+        label = str(first)
+        if first > second:
+            label += "-"
+        if third < second and first == second:
+            label += "."
+        return label
@@ -0,0 +1,206 @@
+"""Compiled ranking overrides.
+
+``fixtures/overrides/<cup>/<cp>.json`` lists, per species, a meta weight
+and optionally the fast and charged moves to rank it with. Each file is
+merged with the species' published (or default) moveset, validated
+against the move registry and compiled into a MetaTable: arrays of
+species ordinal, fast move ordinal, charged move ordinals and weight,
+in the registry's order. ``manage.py build_artifacts`` saves the tables
+under ``artifacts/overrides`` with the content hash of their inputs and
+only recompiles them when it changes.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from pvp.cache import versioned_cache
+
+logger = logging.getLogger(__name__)
+
+OVERRIDES_DIR = Path("pvp/fixtures/overrides")
+COMPILED_DIR = Path("pvp/artifacts/overrides")
+NO_MOVE = -1
+MAX_CHARGED = 2
+
+
+class MetaTable:
+    """Overridden species of a format with their merged movesets and weights."""
+
+    def __init__(self, species, fast, charged, weight):
+        self.species = species
+        self.fast = fast
+        self.charged = charged
+        self.weight = weight
+        self.rows = {int(s): i for i, s in enumerate(species)}
+
+    def __len__(self):
+        return len(self.species)
+
+    def weights(self, ordinals) -> np.ndarray:
+        """Meta weight of each species ordinal; species without an override weigh 1."""
+        rows = [self.rows.get(int(s)) for s in ordinals]
+        return np.array([1.0 if r is None else self.weight[r] for r in rows], dtype=np.float64)
+
+    def moveset(self, ordinal):
+        """(fast ordinal, charged ordinals) of an overridden species, else None."""
+        row = self.rows.get(int(ordinal))
+        if row is None:
+            return None
+        return int(self.fast[row]), [int(c) for c in self.charged[row] if c != NO_MOVE]
+
+
+def overrides_path(cup, cp) -> Path:
+    return OVERRIDES_DIR / cup / f"{cp}.json"
+
+
+def compiled_path(cup, cp) -> Path:
+    return COMPILED_DIR / cup / f"{cp}.npz"
+
+
+def read_overrides(cup, cp) -> list:
+    path = overrides_path(cup, cp)
+    if not path.exists():
+        return []
+    with open(path) as file:
+        return json.load(file)
+
+
+def merge(registry, species, override, published) -> tuple:
+    """Move ids of ``species``: the published or default moveset with the override applied.
+
+    Unknown move ids fall back to the default moveset; moves outside the species' movepool
+    are kept but reported. Returns (fast id, charged ids, problems).
+    """
+    from pvp.engine.rankings import default_moveset
+    problems = []
+    moveset = list(published.get(species.species_id) or default_moveset(species))
+    if override.get("fastMove"):
+        # a few files wrap the fast move in a list
+        fast = override["fastMove"]
+        moveset[0] = fast[0] if isinstance(fast, list) else fast
+    if override.get("chargedMoves"):
+        moveset[1:] = override["chargedMoves"]
+    fast, charged = moveset[0], moveset[1:MAX_CHARGED + 1]
+    unknown = [m for m in [fast] if m not in registry.fast_moves] + [m for m in charged if m not in registry.charged_moves]
+    if unknown:
+        problems.append(f"{species.species_id}: unknown moves {', '.join(unknown)}")
+    charged = [m for m in charged if m in registry.charged_moves]
+    if fast not in registry.fast_moves or not charged:
+        fast, *charged = default_moveset(species)
+    movepool = {m.move_id for m in species.fast_moves + species.charged_moves}
+    outside = [m for m in [fast, *charged] if m not in movepool]
+    if outside:
+        problems.append(f"{species.species_id}: {', '.join(outside)} not in movepool")
+    return fast, charged, problems
+
+
+def compile_overrides(registry, cup, cp, published) -> tuple:
+    """(MetaTable, problems) of the override file of ``cup``/``cp``."""
+    species_index = {s: i for i, s in enumerate(registry.species)}
+    fast_index = {m: i for i, m in enumerate(registry.fast_moves)}
+    charged_index = {m: i for i, m in enumerate(registry.charged_moves)}
+    rows, problems = [], []
+    for override in read_overrides(cup, cp):
+        species = registry.species.get(override["speciesId"])
+        if species is None:
+            problems.append(f"{override['speciesId']}: unknown species")
+            continue
+        if not species.fast_moves or not species.charged_moves:
+            problems.append(f"{species.species_id}: no movepool")
+            continue
+        fast, charged, issues = merge(registry, species, override, published)
+        problems += issues
+        charged = [charged_index[m] for m in charged] + [NO_MOVE] * (MAX_CHARGED - len(charged))
+        rows.append((species_index[species.species_id], fast_index[fast], charged, override.get("weight", 1)))
+    table = MetaTable(
+        np.array([r[0] for r in rows], dtype=np.int32),
+        np.array([r[1] for r in rows], dtype=np.int16),
+        np.array([r[2] for r in rows], dtype=np.int16).reshape(len(rows), MAX_CHARGED),
+        np.array([r[3] for r in rows], dtype=np.float32),
+    )
+    return table, problems
+
+
+@versioned_cache(maxsize=1)
+def registry_digest() -> str:
+    """Digest of what the ordinals and default movesets depend on: move ids and stats in registry
+    order, and each species' types and movepool."""
+    from pvp.registry import get_registry
+    registry = get_registry()
+    digest = hashlib.sha1()
+    for m in registry.fast_moves.values():
+        digest.update(f"{m.move_id}:{m.type},{m.power},{m.cooldown},{m.energy_gain};".encode())
+    for m in registry.charged_moves.values():
+        digest.update(f"{m.move_id}:{m.type},{m.power},{m.cooldown},{m.energy};".encode())
+    for s in registry.species.values():
+        moves = ",".join(m.move_id for m in s.fast_moves + s.charged_moves)
+        digest.update(f"{s.species_id}:{'/'.join(s.types)}:{moves};".encode())
+    return digest.hexdigest()
+
+
+def content_hash(cup, cp, published) -> str:
+    digest = hashlib.sha1(registry_digest().encode())
+    path = overrides_path(cup, cp)
+    if path.exists():
+        digest.update(path.read_bytes())
+    digest.update(json.dumps(published, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _load(path, expected):
+    try:
+        with np.load(path) as data:
+            if str(data["hash"]) != expected:
+                return None
+            return MetaTable(data["species"], data["fast"], data["charged"], data["weight"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+def _save(path, table, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as file:
+        np.savez(file, hash=np.array(content), species=table.species, fast=table.fast,
+                 charged=table.charged, weight=table.weight)
+    os.replace(tmp, path)
+
+
+def _compile(cup, cp, published):
+    from pvp.registry import get_registry
+    table, problems = compile_overrides(get_registry(), cup, cp, published)
+    for problem in problems:
+        logger.warning("%s %s overrides: %s", cup, cp, problem)
+    return table
+
+
+def write_meta_table(cup, cp, force=False):
+    """Compile and save the overrides of a format; the path written, None when the saved table is up to date."""
+    from pvp.engine.rankings import published_movesets
+    published = published_movesets(cup, cp)
+    content = content_hash(cup, cp, published)
+    path = compiled_path(cup, cp)
+    if not force and _load(path, content) is not None:
+        return None
+    _save(path, _compile(cup, cp, published), content)
+    return path
+
+
+@versioned_cache(maxsize=64)
+def get_meta_table(cup, cp) -> MetaTable:
+    """The saved compiled overrides of a format, opened read-only.
+
+    Until build_artifacts has saved them for the current inputs they are compiled in
+    memory and nothing is written.
+    """
+    from pvp.engine.rankings import published_movesets
+    published = published_movesets(cup, cp)
+    table = _load(compiled_path(cup, cp), content_hash(cup, cp, published))
+    if table is None:
+        logger.warning("Overrides of %s %s are missing or out of date, run manage.py build_artifacts", cup, cp)
+        table = _compile(cup, cp, published)
+    return table
@@ -0,0 +1,103 @@
+"""Ranking simulations spread over a process pool.
+
+Every (cup, cp, scenario) is cut into tasks of at most ``task_size`` pairs,
+so a single large pool is split across workers as well. Workers are forked
+after the rosters are built and read them from this module's globals, so
+the gamemaster data and move tables are shared copy-on-write rather than
+pickled per task. Each task only sends back its slice of ratings, which
+the parent writes into the matrices at fixed pair positions: the result
+does not depend on the number of workers or on completion order.
+"""
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from django import db
+
+from pvp.engine.matrix import CHUNK_SIZE, pair_list, simulate_pairs
+from pvp.engine.rankings import SCENARIOS
+
+TASK_SIZE = 250_000
+
+# (cup, cp) -> Roster, filled in the parent before the workers fork
+_rosters = {}
+
+
+def _limit_memory(max_bytes):
+    if max_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+def _simulate(task):
+    key, scenario, start, stop, shields, energy, settings, chunk_size = task
+    roster = _rosters[key]
+    first, second, _ = pair_list(len(roster), shields, energy)
+    first, second = first[start:stop], second[start:stop]
+    results = [simulate_pairs(roster, first[i:i + chunk_size], second[i:i + chunk_size], shields, energy, settings)
+               for i in range(0, len(first), chunk_size)]
+    return np.concatenate(results)
+
+
+def plan(runs, task_size=TASK_SIZE, chunk_size=CHUNK_SIZE):
+    """Tasks for every scenario of every run, largest pools first."""
+    tasks = []
+    for run in sorted(runs, key=lambda r: -len(r.pool)):
+        for scenario in SCENARIOS:
+            shields = tuple(run.scenarios[scenario]["shields"])
+            energy = tuple(run.scenarios[scenario]["energy"])
+            total = len(pair_list(len(run.pool), shields, energy)[0])
+            for start in range(0, total, task_size):
+                stop = min(start + task_size, total)
+                tasks.append(((run.cup, run.cp), scenario, start, stop, shields, energy, run.settings, chunk_size))
+    return tasks
+
+
+def generate(runs, workers=None, task_size=TASK_SIZE, chunk_size=CHUNK_SIZE, max_memory=None, progress=None):
+    """Simulate every scenario of ``runs`` and yield each run once its matrices are complete.
+
+    ``progress`` is called with (done, total, task, seconds) after each task.
+    """
+    runs = {(run.cup, run.cp): run for run in runs}
+    _rosters.clear()
+    _rosters.update({key: run.roster for key, run in runs.items()})
+    for run in runs.values():
+        run.matrices = {s: np.full((len(run.pool), len(run.pool)), 500, dtype=np.int16) for s in SCENARIOS}
+    tasks = plan(runs.values(), task_size, chunk_size)
+    remaining = {key: sum(1 for t in tasks if t[0] == key) for key in runs}
+    start = time.perf_counter()
+
+    def finish(task, result):
+        key, scenario, lo, hi, shields, energy = task[:6]
+        first, second, symmetric = pair_list(len(runs[key].pool), shields, energy)
+        matrix = runs[key].matrices[scenario]
+        matrix[first[lo:hi], second[lo:hi]] = result[:, 0]
+        if symmetric:
+            matrix[second[lo:hi], first[lo:hi]] = result[:, 1]
+        remaining[key] -= 1
+        return remaining[key] == 0
+
+    try:
+        if workers == 1:
+            for done, task in enumerate(tasks, 1):
+                complete = finish(task, _simulate(task))
+                if progress:
+                    progress(done, len(tasks), task, time.perf_counter() - start)
+                if complete:
+                    yield runs[task[0]]
+            return
+        # workers inherit the rosters; they never touch the database
+        db.connections.close_all()
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_limit_memory, initargs=(max_memory,)) as executor:
+            futures = {executor.submit(_simulate, task): task for task in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                task = futures[future]
+                complete = finish(task, future.result())
+                if progress:
+                    progress(done, len(tasks), task, time.perf_counter() - start)
+                if complete:
+                    yield runs[task[0]]
+    finally:
+        _rosters.clear()
@@ -0,0 +1,189 @@
+"""Rankings computed locally from the gamemaster.
+
+A cup and CP give a pool of eligible species, each with one moveset. The
+pool battles itself in every ranking scenario (see ``pvp.engine.matrix``)
+and each scenario's rating matrix is reduced to per-species ratings and
+scores, weighted by the cup's override weights. The output items follow
+the schema of ``fixtures/rankings/<cup>/<category>/rankings-<cp>.json``.
+"""
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from pvp.engine.battle import Combatant, STAB_MULTIPLIER, gamemaster_settings
+from pvp.engine.matrix import Roster, rating_matrix
+from pvp.engine.overrides import get_meta_table, merge
+from pvp.loaders import open_fixture
+
+MATRICES_DIR = Path("pvp/artifacts/matrices")
+# generated rankings stay out of the published fixtures unless they are published explicitly
+GENERATED_DIR = Path("pvp/artifacts/generated")
+CATEGORIES = ["overall", "leads", "closers", "switches", "chargers", "attackers", "consistency"]
+SCENARIOS = ["leads", "closers", "switches", "chargers", "attackers"]
+KEY_OPPONENTS = 50
+MATCHUPS = 5
+
+
+def ranking_targets(cup=None, cp=None) -> list:
+    """(cup, cp) pairs of the published rankings, optionally narrowed down."""
+    from pvp.artifacts import RANKINGS_DIR
+    targets = {(path.parts[-3], path.stem.split("-")[1]) for path in RANKINGS_DIR.glob("*/overall/rankings-*.json")}
+    return sorted((c, p) for c, p in targets if cup in (None, c) and cp in (None, p))
+
+
+def build_pool(registry, cup, cp) -> list:
+    return [registry.species[s] for s in registry.cup_index.pool(cup, cp)]
+
+
+def published_movesets(cup, cp) -> dict:
+    """Movesets of an existing ranking for the cup, else of the open league at the same CP."""
+    from pvp.artifacts import fixture_path
+    for name in (cup, "all"):
+        path = fixture_path(name, cp, "overall")
+        if path.exists():
+            with open(path) as file:
+                return {item["speciesId"]: item["moveset"] for item in json.load(file)}
+    return {}
+
+
+def stab(species, move) -> float:
+    return STAB_MULTIPLIER if move.type in species.types else 1.0
+
+
+def default_moveset(species) -> list:
+    """Best fast move by damage plus energy per turn, and the two best charged moves by damage per energy."""
+    fast = max(species.fast_moves, key=lambda m: (m.power * stab(species, m) + m.energy_gain) / max(m.turns, 1))
+    charged = sorted(species.charged_moves, key=lambda m: -m.power * stab(species, m) / m.energy)
+    # prefer coverage of a second type over a second move of the same type
+    second = [m for m in charged[1:] if m.type != charged[0].type] or charged[1:]
+    return [fast.move_id, charged[0].move_id] + [m.move_id for m in second[:1]]
+
+
+def choose_moveset(registry, species, override, published) -> tuple:
+    fast, charged, _ = merge(registry, species, override, published)
+    return registry.fast_moves[fast], [registry.charged_moves[m] for m in charged]
+
+
+class RankingRun:
+    """Pool, movesets and weights for one cup and CP, plus the matrices once simulated."""
+
+    def __init__(self, registry, cup, cp):
+        self.cup = cup
+        self.cp = str(cp)
+        self.pool = build_pool(registry, cup, cp)
+        meta = get_meta_table(cup, self.cp)
+        published = published_movesets(cup, cp)
+        species_index = {s: i for i, s in enumerate(registry.species)}
+        fast_moves, charged_moves = list(registry.fast_moves.values()), list(registry.charged_moves.values())
+        ordinals = [species_index[s.species_id] for s in self.pool]
+        self.combatants = []
+        for species, ordinal in zip(self.pool, ordinals):
+            moveset = meta.moveset(ordinal)
+            if moveset is None:
+                moves = choose_moveset(registry, species, {}, published)
+            else:
+                moves = fast_moves[moveset[0]], [charged_moves[c] for c in moveset[1]]
+            self.combatants.append(Combatant(species, *moves, int(cp)))
+        self.weights = meta.weights(ordinals)
+        self.scenarios = {s["slug"]: s for s in open_fixture("gamemaster.json")["rankingScenarios"]}
+        self.settings = gamemaster_settings()
+        self.roster = Roster(self.combatants)
+        self.matrices = {}
+
+    def simulate(self, scenario, **kwargs) -> np.ndarray:
+        settings = self.scenarios[scenario]
+        self.matrices[scenario] = rating_matrix(self.roster, tuple(settings["shields"]), tuple(settings["energy"]), self.settings, **kwargs)
+        return self.matrices[scenario]
+
+    def ratings(self, matrix) -> np.ndarray:
+        """Weighted average rating of each species against the rest of the pool."""
+        weights = np.broadcast_to(self.weights, matrix.shape).copy()
+        np.fill_diagonal(weights, 0)
+        total = weights.sum(axis=1)
+        return np.where(total > 0, (matrix * weights).sum(axis=1) / np.maximum(total, 1), 500)
+
+    def results(self) -> dict:
+        """Ranking items for every category, best first."""
+        ratings = {s: self.ratings(self.matrices[s]) for s in SCENARIOS}
+        # consistency: how well a species does in its worst scenario of each matchup
+        worst = np.minimum.reduce([self.matrices[s] for s in SCENARIOS])
+        ratings["consistency"] = self.ratings(worst)
+        scores = {c: scale(r) for c, r in ratings.items()}
+        roles = SCENARIOS + ["consistency"]
+        scores["overall"] = np.round(np.mean([scores[c] for c in roles], axis=0), 1)
+        ratings["overall"] = ratings["leads"]
+        matrices = dict(self.matrices, consistency=worst, overall=self.matrices["leads"])
+
+        results = {}
+        for category in CATEGORIES:
+            order = sorted(range(len(self.pool)), key=lambda i: (-scores[category][i], self.pool[i].species_id))
+            key_opponents = np.array(order[:KEY_OPPONENTS])
+            items = []
+            for i in order:
+                item = self.item(i, int(round(ratings[category][i])), float(scores[category][i]), matrices[category], key_opponents)
+                if category == "overall":
+                    item["scores"] = [float(scores[c][i]) for c in roles]
+                if category in ("overall", "consistency"):
+                    item["stats"] = self.stats(i)
+                items.append(item)
+            results[category] = items
+        return results
+
+    def item(self, i, rating, score, matrix, key_opponents) -> dict:
+        species = self.pool[i]
+        combatant = self.combatants[i]
+        opponents = key_opponents[key_opponents != i]
+        row = matrix[i, opponents]
+        best = opponents[np.argsort(-row, kind="stable")[:MATCHUPS]]
+        worst = opponents[np.argsort(row, kind="stable")[:MATCHUPS]]
+        return {
+            "speciesId": species.species_id,
+            "speciesName": species.species_name,
+            "rating": rating,
+            "matchups": [{"opponent": self.pool[j].species_id, "rating": int(matrix[i, j])} for j in best],
+            "counters": [{"opponent": self.pool[j].species_id, "rating": int(matrix[i, j])} for j in worst],
+            "moves": {
+                "fastMoves": [{"moveId": m.move_id, "uses": None} for m in species.fast_moves],
+                "chargedMoves": [{"moveId": m.move_id, "uses": None} for m in species.charged_moves],
+            },
+            "moveset": [m.move_id for m in combatant.moves],
+            "score": score,
+        }
+
+    def stats(self, i) -> dict:
+        c = self.combatants[i]
+        return {
+            "product": round(c.atk * c.defense * c.hp / 1000),
+            "atk": math.floor(c.atk * 10) / 10,
+            "def": math.floor(c.defense * 10) / 10,
+            "hp": c.hp,
+        }
+
+    def save_matrices(self, directory=MATRICES_DIR):
+        target = Path(directory) / self.cup / self.cp
+        target.mkdir(parents=True, exist_ok=True)
+        for scenario, matrix in self.matrices.items():
+            np.save(target / f"{scenario}.npy", matrix)
+        with open(target / "species.json", "w") as file:
+            json.dump([s.species_id for s in self.pool], file)
+        return target
+
+
+def scale(ratings) -> np.ndarray:
+    """Scores out of 100 relative to the best rating."""
+    return np.round(100 * ratings / max(ratings.max(), 1), 1)
+
+
+def write_rankings(results, cup, cp, directory):
+    paths = []
+    for category, items in results.items():
+        path = Path(directory) / cup / category / f"rankings-{cp}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as file:
+            json.dump(items, file, separators=(",", ":"))
+        tmp.replace(path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,193 @@
+"""Team coverage scoring and teammate suggestions.
+
+A format's lead matrix is turned into a boolean win matrix restricted to
+the meta (the top of the published overall rankings). A team covers a
+meta opponent when any member beats it, and a team's coverage is the
+override weight of the covered opponents over the weight of the whole
+meta. Teammates are suggested with a beam search that fills the free
+slots one at a time, scoring every candidate for every beam state with a
+single boolean matrix product.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from pvp.cache import versioned_cache
+from pvp.engine.battle import Combatant
+from pvp.engine.matrix import Roster, rating_matrix
+from pvp.engine.overrides import get_meta_table
+from pvp.engine.rankings import MATRICES_DIR, choose_moveset
+
+logger = logging.getLogger(__name__)
+
+META_SIZE = 100
+TEAM_SIZE = 3
+BEAM_WIDTH = 16
+SUGGESTIONS = 5
+
+
+class TeamMatrix:
+    def __init__(self, species_ids, ratings, meta_ids, weights):
+        self.species = list(species_ids)
+        self.index = {s: i for i, s in enumerate(self.species)}
+        self.meta = np.array([self.index[s] for s in meta_ids if s in self.index], dtype=np.intp)
+        self.meta_ids = [self.species[i] for i in self.meta]
+        self.weights = np.array([weights.get(s, 1) for s in self.meta_ids], dtype=np.float64)
+        # wins[i, k]: species i beats meta opponent k
+        self.wins = np.ascontiguousarray(ratings[:, self.meta] > 500)
+        self.ratings = np.ascontiguousarray(ratings[:, self.meta], dtype=np.float32)
+        self.total = max(self.weights.sum(), 1)
+
+    def __contains__(self, species_id):
+        return species_id in self.index
+
+    def members(self, team):
+        return [self.index[s] for s in team if s in self.index]
+
+    def covered(self, team) -> np.ndarray:
+        return self.wins[self.members(team)].any(axis=0)
+
+    def coverage(self, team) -> float:
+        """Weighted share of the meta beaten by at least one member."""
+        return float(self.weights[self.covered(team)].sum() / self.total)
+
+    def threats(self, team, n=SUGGESTIONS) -> list:
+        """Heaviest meta opponents that no member beats, with the team's best rating against them."""
+        members = self.members(team)
+        best = self.ratings[members].max(axis=0) if members else np.zeros(len(self.meta))
+        uncovered = np.nonzero(~self.covered(team))[0]
+        uncovered = uncovered[np.lexsort((best[uncovered], -self.weights[uncovered]))]
+        return [(self.meta_ids[k], int(best[k])) for k in uncovered[:n]]
+
+    def _scores(self, covered, best):
+        """(coverage gain, best answers) of adding each species to each beam state."""
+        gain = (covered[:, None, :] | self.wins[None, :, :]) @ self.weights
+        answers = np.maximum(best[:, None, :], self.ratings[None, :, :]) @ self.weights
+        return gain, answers
+
+    def suggest(self, team, n=SUGGESTIONS, beam_width=BEAM_WIDTH) -> list:
+        """Best ways to fill the free slots of ``team``: [(species ids, coverage)], best first."""
+        members = self.members(team)
+        free = TEAM_SIZE - len(members)
+        if free <= 0 or not len(self.meta):
+            return []
+        beams = [tuple(members)]
+        covered = self.wins[members].any(axis=0)[None, :]
+        best = (self.ratings[members].max(axis=0) if members else np.zeros(len(self.meta), dtype=np.float32))[None, :]
+        for depth in range(free):
+            gain, answers = self._scores(covered, best)
+            for b, beam in enumerate(beams):
+                gain[b, list(beam)] = -np.inf
+            width = beam_width if depth < free - 1 else n * 4
+            # coverage first; the weighted best answer to each opponent breaks ties
+            flat = np.lexsort((-answers.ravel(), -gain.ravel()))
+            chosen, seen = [], set()
+            for f in flat:
+                b, c = divmod(int(f), gain.shape[1])
+                if not np.isfinite(gain[b, c]):
+                    break
+                key = frozenset(beams[b][len(members):] + (c,))
+                if key in seen:
+                    continue
+                seen.add(key)
+                chosen.append((b, c))
+                if len(chosen) == width:
+                    break
+            beams = [beams[b] + (c,) for b, c in chosen]
+            covered = np.stack([covered[b] | self.wins[c] for b, c in chosen])
+            best = np.stack([np.maximum(best[b], self.ratings[c]) for b, c in chosen])
+        results = []
+        for beam, cov in zip(beams[:n], covered):
+            results.append(([self.species[i] for i in beam[len(members):]], float(self.weights[cov].sum() / self.total)))
+        return results
+
+    def partners(self, species_id, n=SUGGESTIONS) -> list:
+        """Distinct teammates from the best teams built around ``species_id``."""
+        partners = []
+        for added, _ in self.suggest([species_id], n * 2):
+            for s in added:
+                if s not in partners:
+                    partners.append(s)
+        return partners[:n]
+
+
+def matrix_dir(cup, cp) -> Path:
+    return MATRICES_DIR / cup / str(cp)
+
+
+def _published(cup, cp) -> list:
+    from pvp.views.rankings import load_ranking_context
+    return [item["speciesId"] for item in load_ranking_context(cup, str(cp), "overall")]
+
+
+def build_lead_matrix(cup, cp) -> Path:
+    """Simulate the leads scenario for the published ranking pool and save it like generate_rankings does."""
+    from pvp.registry import get_registry
+    from pvp.views.rankings import load_ranking_context
+    registry = get_registry()
+    items = [item for item in load_ranking_context(cup, str(cp), "overall") if item["speciesId"] in registry.species]
+    movesets = {item["speciesId"]: item["moveset"] for item in items}
+    pool = [registry.species[item["speciesId"]] for item in items]
+    combatants = [Combatant(s, *choose_moveset(registry, s, {}, movesets), int(cp)) for s in pool]
+    logger.info("Simulating %s %s leads for %d pokemon", cup, cp, len(pool))
+    matrix = rating_matrix(Roster(combatants), (1, 1), (0, 0))
+    target = matrix_dir(cup, cp)
+    target.mkdir(parents=True, exist_ok=True)
+    # species.json is written last and both files are replaced whole, so readers never pair mismatched files
+    tmp = target / f"leads.{os.getpid()}.tmp"
+    with open(tmp, "wb") as file:
+        np.save(file, matrix)
+    os.replace(tmp, target / "leads.npy")
+    tmp = target / f"species.{os.getpid()}.tmp"
+    with open(tmp, "w") as file:
+        json.dump([s.species_id for s in pool], file)
+    os.replace(tmp, target / "species.json")
+    return target
+
+
+def _stamp(cup, cp):
+    """mtimes of a saved lead matrix, None when it isn't built.
+
+    The matrices aren't part of the data version, so the caches below are keyed on this
+    to pick up a build.
+    """
+    target = matrix_dir(cup, cp)
+    try:
+        return tuple((target / name).stat().st_mtime_ns for name in ("leads.npy", "species.json"))
+    except FileNotFoundError:
+        return None
+
+
+@versioned_cache(maxsize=8)
+def _load_team_matrix(cup, cp, stamp):
+    if stamp is None:
+        return None
+    target = matrix_dir(cup, cp)
+    with open(target / "species.json") as file:
+        species = json.load(file)
+    ratings = np.load(target / "leads.npy")
+    from pvp.registry import get_registry
+    registry_ids = list(get_registry().species)
+    meta = get_meta_table(cup, cp)
+    weights = {registry_ids[s]: float(w) for s, w in zip(meta.species, meta.weight)}
+    return TeamMatrix(species, ratings, _published(cup, cp)[:META_SIZE], weights)
+
+
+def get_team_matrix(cup="all", cp="1500"):
+    """TeamMatrix of a format from its saved lead matrix (see build_team_matrices); None when it isn't built."""
+    return _load_team_matrix(cup, str(cp), _stamp(cup, cp))
+
+
+@versioned_cache(maxsize=4096)
+def _suggested_teammates(cup, cp, species_id, stamp) -> list:
+    matrix = _load_team_matrix(cup, cp, stamp)
+    if matrix is None or species_id not in matrix:
+        return []
+    return matrix.partners(species_id)
+
+
+def suggested_teammates(cup, cp, species_id) -> list:
+    return _suggested_teammates(cup, str(cp), species_id, _stamp(cup, cp))
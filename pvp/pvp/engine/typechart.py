@@ -0,0 +1,129 @@
+import numpy as np
+
+TYPES = [
+    "bug", "dark", "dragon", "electric", "fairy", "fighting", "fire", "flying", "ghost",
+    "grass", "ground", "ice", "normal", "poison", "psychic", "rock", "steel", "water",
+]
+TYPE_INDEX = {t: i for i, t in enumerate(TYPES)}
+# index of "none" and unknown types in the padded tables below
+NO_TYPE = len(TYPES)
+
+SUPER_EFFECTIVE = 1.6
+NOT_VERY_EFFECTIVE = 0.625
+IMMUNE = 0.390625
+
+# attacking type -> (super effective against, not very effective against, no effect on)
+_CHART = {
+    "bug": (["dark", "grass", "psychic"], ["fairy", "fighting", "fire", "flying", "ghost", "poison", "steel"], []),
+    "dark": (["ghost", "psychic"], ["dark", "fairy", "fighting"], []),
+    "dragon": (["dragon"], ["steel"], ["fairy"]),
+    "electric": (["flying", "water"], ["dragon", "electric", "grass"], ["ground"]),
+    "fairy": (["dark", "dragon", "fighting"], ["fire", "poison", "steel"], []),
+    "fighting": (["dark", "ice", "normal", "rock", "steel"], ["bug", "fairy", "flying", "poison", "psychic"], ["ghost"]),
+    "fire": (["bug", "grass", "ice", "steel"], ["dragon", "fire", "rock", "water"], []),
+    "flying": (["bug", "fighting", "grass"], ["electric", "rock", "steel"], []),
+    "ghost": (["ghost", "psychic"], ["dark"], ["normal"]),
+    "grass": (["ground", "rock", "water"], ["bug", "dragon", "fire", "flying", "grass", "poison", "steel"], []),
+    "ground": (["electric", "fire", "poison", "rock", "steel"], ["bug", "grass"], ["flying"]),
+    "ice": (["dragon", "flying", "grass", "ground"], ["fire", "ice", "steel", "water"], []),
+    "normal": ([], ["rock", "steel"], ["ghost"]),
+    "poison": (["fairy", "grass"], ["ghost", "ground", "poison", "rock"], ["steel"]),
+    "psychic": (["fighting", "poison"], ["psychic", "steel"], ["dark"]),
+    "rock": (["bug", "fire", "flying", "ice"], ["fighting", "ground", "steel"], []),
+    "steel": (["fairy", "ice", "rock"], ["electric", "fire", "steel", "water"], []),
+    "water": (["fire", "ground", "rock"], ["dragon", "grass", "water"], []),
+}
+
+
+def _build_chart():
+    chart = np.ones((len(TYPES), len(TYPES)), dtype=np.float64)
+    for attacker, (strong, weak, immune) in _CHART.items():
+        row = TYPE_INDEX[attacker]
+        for defender in strong:
+            chart[row, TYPE_INDEX[defender]] = SUPER_EFFECTIVE
+        for defender in weak:
+            chart[row, TYPE_INDEX[defender]] = NOT_VERY_EFFECTIVE
+        for defender in immune:
+            chart[row, TYPE_INDEX[defender]] = IMMUNE
+    chart.setflags(write=False)
+    return chart
+
+
+# CHART[attacking type, defending type]
+CHART = _build_chart()
+
+
+def _pad(chart):
+    padded = np.ones((NO_TYPE + 1, NO_TYPE + 1))
+    padded[:NO_TYPE, :NO_TYPE] = chart
+    padded.setflags(write=False)
+    return padded
+
+
+# CHART with a neutral row and column for "none"
+EFFECTIVENESS = _pad(CHART)
+
+
+def _build_profiles():
+    profiles = EFFECTIVENESS[:NO_TYPE, :, None] * EFFECTIVENESS[:NO_TYPE, None, :]
+    profiles = np.ascontiguousarray(profiles.transpose(1, 2, 0))
+    profiles.setflags(write=False)
+    return profiles
+
+
+# PROFILES[defending type 1, defending type 2] -> multiplier of every attacking type
+PROFILES = _build_profiles()
+
+
+def _label(multiplier):
+    return f"{multiplier:.3g}"
+
+
+def _build_matchups():
+    weaknesses, resistances = {}, {}
+    for first in range(NO_TYPE + 1):
+        for second in range(NO_TYPE + 1):
+            profile = PROFILES[first, second]
+            strongest = np.argsort(-profile, kind="stable")
+            weakest = np.argsort(profile, kind="stable")
+            weaknesses[first, second] = tuple((TYPES[i], _label(profile[i])) for i in strongest if profile[i] > 1)
+            resistances[first, second] = tuple((TYPES[i], _label(profile[i])) for i in weakest if profile[i] < 1)
+    return weaknesses, resistances
+
+
+_WEAKNESSES, _RESISTANCES = _build_matchups()
+
+
+def type_index(t) -> int:
+    return TYPE_INDEX.get(t, NO_TYPE)
+
+
+def _key(types):
+    types = list(types)[:2] + ["none"] * (2 - len(types))
+    return type_index(types[0]), type_index(types[1])
+
+
+def defensive_profile(types) -> np.ndarray:
+    """Multiplier of every attacking type, in TYPES order, against a defender with ``types``."""
+    return PROFILES[_key(types)]
+
+
+def weaknesses(types) -> tuple:
+    """(attacking type, multiplier) pairs that are super effective against ``types``, strongest first."""
+    return _WEAKNESSES[_key(types)]
+
+
+def resistances(types) -> tuple:
+    """(attacking type, multiplier) pairs that ``types`` resists, most resisted first."""
+    return _RESISTANCES[_key(types)]
+
+
+def multipliers(move_types, defender_types) -> np.ndarray:
+    """Effectiveness for arrays of move type indices against defender type index pairs (shape (..., 2))."""
+    defender_types = np.asarray(defender_types)
+    return EFFECTIVENESS[move_types, defender_types[..., 0]] * EFFECTIVENESS[move_types, defender_types[..., 1]]
+
+
+def effectiveness(move_type: str, types) -> float:
+    """Multiplier of a move type against a (possibly dual) typed defender; "none" types are neutral."""
+    return float(defensive_profile(types)[TYPE_INDEX[move_type]]) if move_type in TYPE_INDEX else 1.0
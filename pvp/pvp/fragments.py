@@ -0,0 +1,182 @@
+"""Pre-rendered ranking rows.
+
+Every row of a scenario is rendered once with ``ranking_item.html`` and
+stored in one file per (cup, cp, category): a header, the byte offset of
+each position and the zlib-compressed UTF-8 rows back to back. The rankings
+view joins the rows of a page straight from the mapped file.
+
+The files are not part of the data version (they are derived from it), so
+a rebuild next to live traffic does not flush every cache; readers reopen
+a file when its mtime changes. The header carries a stamp of the data
+version, the row templates and the derived artifacts (IV tables,
+performance index, overrides and team matrix) the file was rendered
+with; a file whose stamp differs from the current one is not served.
+"""
+import hashlib
+import mmap
+import multiprocessing
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django import db
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+from pvp.artifacts import fixture_path
+from pvp.cache import data_version, versioned_cache
+
+FRAGMENTS_DIR = Path("pvp/artifacts/fragments")
+# everything a row's HTML depends on besides the data
+TEMPLATES = [Path("pvp/templates") / name for name in (
+    "ranking_item.html", "matchup_ranking_item.html", "move_tab.html", "tab_stats.html", "tab_misc.html",
+)] + [Path("pvp/templatetags/ranking_tags.py")]
+
+MAGIC = b"PVPF"
+VERSION = 3
+# magic, version, rows, stamp
+HEADER = struct.Struct("<4sHI20s")
+OFFSET = struct.Struct("<I")
+
+
+def fragments_path(format, cp, category) -> Path:
+    return FRAGMENTS_DIR / format / category / f"rankings-{cp}.rows"
+
+
+def derived(format, cp) -> list:
+    """The artifacts derived from the data that the rows of a format render: its IV tables,
+    performance index, override table and team matrix."""
+    from pvp.engine.ivs import IV_TABLES_DIR
+    from pvp.engine.overrides import compiled_path
+    from pvp.engine.teams import matrix_dir
+    from pvp.performance import performance_path
+    return [IV_TABLES_DIR / str(cp) / "species.json", performance_path(format, cp), compiled_path(format, cp),
+            matrix_dir(format, cp) / "leads.npy", matrix_dir(format, cp) / "species.json"]
+
+
+def stamp(format, cp) -> bytes:
+    """Digest of the data version, the row templates and the derived artifacts of a format."""
+    digest = hashlib.sha1(data_version().encode())
+    for path in TEMPLATES:
+        stat = path.stat()
+        digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    # they aren't part of the data version, a rebuild has to rerender the rows too
+    for path in derived(format, cp):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            digest.update(f"{path}:missing;".encode())
+        else:
+            digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return digest.digest()
+
+
+def render_row(item, format, cp) -> str:
+    return render_to_string("ranking_item.html", {"ranking": item, "p": item["speciesId"], "cup": format, "cp": cp})
+
+
+def encode(rows, stamp=bytes(20)) -> bytes:
+    blobs = [zlib.compress(row.encode()) for row in rows]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, len(blobs), stamp),
+        b"".join(OFFSET.pack(o) for o in offsets),
+        *blobs,
+    ])
+
+
+def write_fragments(format, cp, category, target: Path = None) -> int:
+    from pvp.views.rankings import load_ranking_context
+    target = target or fragments_path(format, cp, category)
+    # taken before rendering: data that changes meanwhile leaves the file stale, not mislabeled
+    current = stamp(format, cp)
+    data = encode((render_row(item, format, cp) for item in load_ranking_context(format, cp, category)), current)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as file:
+        file.write(data)
+    # live readers keep their mapping of the old file
+    os.replace(tmp, target)
+    return len(data)
+
+
+class RowFragments:
+    """Rendered rows of a scenario by ranking position."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._rows, self.stamp = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} fragment file")
+        self._offsets = struct.unpack_from(f"<{self._rows + 1}I", self._mm, HEADER.size)
+        self._blob_at = HEADER.size + OFFSET.size * (self._rows + 1)
+
+    def __len__(self):
+        return self._rows
+
+    def row(self, position) -> str:
+        start, stop = self._offsets[position - 1], self._offsets[position]
+        return zlib.decompress(self._mm[self._blob_at + start:self._blob_at + stop]).decode()
+
+    def page(self, page, query) -> str:
+        """The rows of a Paginator page, joined like ranking_table.html does."""
+        rows = [self.row(item["position"]) for item in page]
+        if rows and page.has_next():
+            rows[-1] = (f'<div hx-target="this" hx-trigger="revealed" hx-swap="afterend" '
+                        f'hx-get="?{escape(query)}page={page.next_page_number()}">{rows[-1]}</div>')
+        return "".join(rows)
+
+
+@versioned_cache(maxsize=32)
+def _open_fragments(path, mtime):
+    return RowFragments(path)
+
+
+def open_fragments(format, cp, category):
+    """The rendered rows of a scenario, or None if they are missing, older than its fixture,
+    of another format version or rendered from other data, templates or derived artifacts."""
+    path = fragments_path(format, cp, category)
+    try:
+        mtime = path.stat().st_mtime
+        if mtime < fixture_path(format, cp, category).stat().st_mtime:
+            return None
+        fragments = _open_fragments(path, mtime)
+    except (FileNotFoundError, ValueError):
+        return None
+    return fragments if fragments.stamp == stamp(format, cp) else None
+
+
+def _render(scenario):
+    return scenario, write_fragments(*scenario)
+
+
+def render_all(selected, workers=None, progress=None):
+    """Render the rows of every scenario in ``selected``; ``progress`` gets (scenario, bytes or error)."""
+    from pvp.registry import get_registry
+    # load the registry once so the forked workers share it
+    get_registry()
+    if workers == 1:
+        for scenario in selected:
+            try:
+                result = _render(scenario)[1]
+            except Exception as error:
+                result = error
+            if progress:
+                progress(scenario, result)
+        return
+    db.connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        futures = {executor.submit(_render, scenario): scenario for scenario in selected}
+        for future in as_completed(futures):
+            try:
+                result = future.result()[1]
+            except Exception as error:
+                result = error
+            if progress:
+                progress(futures[future], result)
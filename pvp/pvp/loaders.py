@@ -0,0 +1,114 @@
+import hashlib
+import json
+
+from django.db import connection, models
+
+from pvp.models import Pokemon
+
+DEFAULT_FORMATS = [
+    {"title": "Great League", "cup": "all", "cp": 1500, "meta": "great", "showFormat": True},
+    {"title": "Ultra League", "cup": "all", "cp": 2500, "meta": "ultra", "showFormat": True},
+    {"title": "Master League", "cup": "all", "cp": 10000, "meta": "master", "showFormat": True},
+]
+
+def open_fixture(filename):
+    with open(f"pvp/fixtures/{filename}") as f:
+        return json.load(f)
+
+def record_hash(record) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def fast_move_fields(m):
+    return dict(
+        name=m["name"],
+        move_id=m["moveId"],
+        abbreviation=m.get("abbreviation", None),
+        energy_gain=m["energyGain"],
+        type=m.get("type","none"),
+        power=m.get("power", 0),
+        cooldown=m.get("cooldown",500),
+        content_hash=record_hash(m),
+        )
+
+def charged_move_fields(m):
+    return dict(
+        name=m["name"],
+        move_id=m["moveId"],
+        energy=m["energy"],
+        abbreviation=m.get("abbreviation", None),
+        type=m.get("type","none"),
+        power=m.get("power", 0),
+        cooldown=m.get("cooldown",500),
+        buffs=m.get("buffs", None),
+        buff_target=m.get("buffTarget", None),
+        buff_self=m.get("buffsSelf", None),
+        buff_opponent=m.get("buffsOpponent", None),
+        buff_apply_chance=float(m.get("buffApplyChance", 0)),
+        content_hash=record_hash(m),
+        )
+
+def pokemon_fields(pokemon):
+    return dict(
+        dex=pokemon["dex"],
+        species_name=pokemon["speciesName"],
+        species_id=pokemon["speciesId"],
+        base_stats=pokemon["baseStats"],
+        types=pokemon["types"],
+        elite_moves=pokemon.get("eliteMoves", None),
+        legacy_moves=pokemon.get("legacyMoves", None),
+        level_25CP=pokemon.get("level25CP", None),
+        default_ivs=pokemon.get("defaultIVs", None),
+        buddy_distance=pokemon.get("buddyDistance", None),
+        third_move_cost=pokemon.get("thirdMoveCost", 0),
+        released=pokemon.get("released", False),
+        family=pokemon.get("family", None),
+        content_hash=record_hash(pokemon),
+        )
+
+def format_fields(format):
+    return dict(title=format["title"], cup=format.get("cup"), cp=format["cp"], meta=format["meta"], show=format["showFormat"], content_hash=record_hash(format))
+
+def is_fast_move(m):
+    return m.get('energy') == 0
+
+def copy_rows(model, columns, rows):
+    """Insert plain rows, through COPY on PostgreSQL and bulk_create elsewhere."""
+    if connection.vendor == "postgresql":
+        from psycopg.types.json import Jsonb
+        table = connection.ops.quote_name(model._meta.db_table)
+        cols = ", ".join(connection.ops.quote_name(model._meta.get_field(c).column) for c in columns)
+        json_columns = [i for i, c in enumerate(columns) if isinstance(model._meta.get_field(c), models.JSONField)]
+        with connection.cursor() as cursor:
+            with cursor.cursor.copy(f"COPY {table} ({cols}) FROM STDIN") as copy:
+                for row in rows:
+                    if json_columns:
+                        row = list(row)
+                        for i in json_columns:
+                            if row[i] is not None:
+                                row[i] = Jsonb(row[i])
+                    copy.write_row(row)
+    else:
+        model.objects.bulk_create([model(**dict(zip(columns, row))) for row in rows], batch_size=1000)
+
+def copy_links(field, links):
+    through = field.remote_field.through
+    copy_rows(through, [f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"], links)
+
+def pokemon_links(pokemon_data, pokemon, fast_moves, charged_moves, tags):
+    """Build (pokemon pk, target pk) rows for the fast move, charged move and tag through tables."""
+    fast_links, charged_links, tag_links = [], [], []
+    for data, pk in zip(pokemon_data, pokemon):
+        if data.get("released"):
+            fast_links += [(pk, fast_moves[m]) for m in dict.fromkeys(data.get("fastMoves"))]
+            charged_links += [(pk, charged_moves[m]) for m in dict.fromkeys(data.get("chargedMoves"))]
+        tag_links += [(pk, tags[t]) for t in dict.fromkeys(data.get("tags", []))]
+    return fast_links, charged_links, tag_links
+
+def insert_links(fast_links, charged_links, tag_links):
+    copy_links(Pokemon._meta.get_field("fast_moves"), fast_links)
+    copy_links(Pokemon._meta.get_field("charged_moves"), charged_links)
+    copy_links(Pokemon._meta.get_field("tags"), tag_links)
+
+def delete_links(pokemon):
+    for name in ("fast_moves", "charged_moves", "tags"):
+        Pokemon._meta.get_field(name).remote_field.through.objects.filter(pokemon_id__in=pokemon).delete()
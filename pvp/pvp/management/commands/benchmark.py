@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from pvp import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the ranking hot paths and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument("cases", nargs="*", help="Only run cases whose name contains one of these")
+        parser.add_argument("--output", default=str(benchmarks.BENCHMARKS_DIR), help="Directory for the JSON report")
+        parser.add_argument("--no-load-data", action="store_true", help="Skip the load_data case, which rewrites the database")
+        parser.add_argument("--compare", help="Baseline report to check for regressions")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline")
+
+    def handle(self, *args, **options):
+        def progress(name, result):
+            warm = f", warm {result['warm_median'] * 1000:.1f}ms" if "warm_median" in result else ""
+            self.stdout.write(f"{name}: cold {result['cold'] * 1000:.1f}ms{warm}, "
+                              f"{result['peak_memory'] / 2**20:.1f}MB peak, {result['queries']} queries")
+
+        report = benchmarks.run(options["cases"], not options["no_load_data"], progress)
+        path = benchmarks.save(report, benchmarks.Path(options["output"]))
+        self.stdout.write(self.style.SUCCESS(f"Saved {path}"))
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                baseline = json.load(file)
+            found = benchmarks.regressions(report, baseline, options["tolerance"])
+            for name, metric, previous, current in found:
+                self.stdout.write(self.style.ERROR(f"{name} {metric}: {previous:.4g} -> {current:.4g}"))
+            if found:
+                raise CommandError(f"{len(found)} regressions against {options['compare']}")
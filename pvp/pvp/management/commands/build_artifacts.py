@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from pvp.artifacts import ARTIFACTS_DIR, RANKINGS_DIR, write_artifact
+from pvp.engine.ivs import build_tables
+from pvp.engine.overrides import write_meta_table
+from pvp.engine.rankings import ranking_targets
+from pvp.performance import is_stale, performance_path, write_index
+
+
+class Command(BaseCommand):
+    help = 'Build binary ranking artifacts from the ranking fixtures'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild artifacts that are up to date")
+
+    def handle(self, *args, **options):
+        built = 0
+        for source in sorted(RANKINGS_DIR.glob("*/*/rankings-*.json")):
+            target = ARTIFACTS_DIR / source.relative_to(RANKINGS_DIR).with_suffix(".bin")
+            if not options["force"] and target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+                continue
+            size = write_artifact(source, target)
+            built += 1
+            self.stdout.write(f"{target} ({source.stat().st_size} -> {size} bytes)")
+        self.stdout.write(self.style.SUCCESS(f"Built {built} ranking artifacts"))
+        tables = build_tables(force=options["force"])
+        for target in tables:
+            self.stdout.write(f"{target}")
+        self.stdout.write(self.style.SUCCESS(f"Built {len(tables)} IV tables"))
+        indexed = 0
+        for cup, cp in ranking_targets():
+            if not options["force"] and not is_stale(cup, cp):
+                continue
+            size = write_index(cup, cp)
+            indexed += 1
+            self.stdout.write(f"{performance_path(cup, cp)} ({size} bytes)")
+        self.stdout.write(self.style.SUCCESS(f"Built {indexed} performance indexes"))
+        compiled = 0
+        for cup, cp in ranking_targets():
+            target = write_meta_table(cup, cp, force=options["force"])
+            if target is None:
+                continue
+            compiled += 1
+            self.stdout.write(f"{target}")
+        self.stdout.write(self.style.SUCCESS(f"Compiled {compiled} override tables"))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pvp.engine.overrides import write_meta_table
+from pvp.engine.rankings import ranking_targets
+from pvp.engine.teams import build_lead_matrix, matrix_dir
+
+
+class Command(BaseCommand):
+    help = 'Simulate the lead matrices the team builder scores teams with'
+
+    def add_arguments(self, parser):
+        parser.add_argument("cup", nargs="?", help="Cup to build; every published cup if omitted")
+        parser.add_argument("cp", nargs="?", help="CP cap to build; every published cap of the cup if omitted")
+        parser.add_argument("--force", action="store_true", help="Rebuild matrices that already exist")
+
+    def handle(self, *args, **options):
+        targets = ranking_targets(options["cup"], options["cp"])
+        if not targets:
+            raise CommandError(f"No published rankings for {options['cup'] or 'any cup'} {options['cp'] or ''}".strip())
+        built = 0
+        for cup, cp in targets:
+            # the team matrix weighs the meta with the override tables, saved here so requests don't compile them
+            write_meta_table(cup, cp)
+            if not options["force"] and (matrix_dir(cup, cp) / "leads.npy").exists():
+                continue
+            start = time.perf_counter()
+            target = build_lead_matrix(cup, cp)
+            built += 1
+            self.stdout.write(f"{target} ({time.perf_counter() - start:.1f}s)")
+        self.stdout.write(self.style.SUCCESS(f"Built {built} team matrices"))
@@ -0,0 +1,55 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pvp.artifacts import RANKINGS_DIR
+from pvp.engine.matrix import CHUNK_SIZE
+from pvp.engine.parallel import TASK_SIZE, generate
+from pvp.engine.rankings import GENERATED_DIR, MATRICES_DIR, RankingRun, ranking_targets, write_rankings
+from pvp.registry import get_registry
+
+
+class Command(BaseCommand):
+    help = 'Simulate cups all-vs-all and write their rankings'
+
+    def add_arguments(self, parser):
+        parser.add_argument("cup", nargs="?", help="Cup to rank; every published cup if omitted")
+        parser.add_argument("cp", nargs="?", help="CP cap to rank; every published cap of the cup if omitted")
+        output = parser.add_mutually_exclusive_group()
+        output.add_argument("--output", default=str(GENERATED_DIR), help="Rankings directory to write to")
+        output.add_argument("--publish", action="store_true", help=f"Overwrite the published rankings in {RANKINGS_DIR}")
+        parser.add_argument("--matrices", default=str(MATRICES_DIR), help="Directory for the rating matrices")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+        parser.add_argument("--max-memory", type=int, default=2048, help="Address space limit per worker in MB, 0 for none")
+        parser.add_argument("--task-size", type=int, default=TASK_SIZE, help="Battles per worker task")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Battles simulated per batch")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        cup, cp = options["cup"], options["cp"]
+        targets = [(cup, cp)] if cup and cp else ranking_targets(cup, cp)
+        if not targets:
+            raise CommandError(f"No published rankings for {cup or 'any cup'} {cp or ''}".strip())
+        output = RANKINGS_DIR if options["publish"] else options["output"]
+        registry = get_registry()
+        runs = []
+        for cup, cp in targets:
+            try:
+                run = RankingRun(registry, cup, cp)
+            except KeyError as e:
+                raise CommandError(f"Unknown cup {e}")
+            if not run.pool:
+                raise CommandError(f"No eligible pokemon for {cup} {cp}")
+            self.stdout.write(f"{cup} {cp}: {len(run.pool)} pokemon")
+            runs.append(run)
+
+        for run in generate(runs, options["workers"], options["task_size"], options["chunk_size"],
+                            options["max_memory"] * 2 ** 20, self.progress):
+            run.save_matrices(options["matrices"])
+            write_rankings(run.results(), run.cup, run.cp, output)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {run.cup} {run.cp}"))
+        self.stdout.write(self.style.SUCCESS(f"Generated {len(runs)} rankings in {time.perf_counter() - start:.1f}s"))
+
+    def progress(self, done, total, task, seconds):
+        (cup, cp), scenario, lo, hi = task[:4]
+        self.stdout.write(f"[{done}/{total}] {cup} {cp} {scenario} {lo}-{hi} ({seconds:.1f}s)")
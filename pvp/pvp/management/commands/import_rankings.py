@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from pvp import ranking_store
+from pvp.artifacts import scenarios
+from pvp.cache import expire_data_version
+from pvp.models import DataVersion
+from pvp.registry import get_registry
+from pvp.views.rankings import load_ranking_file
+
+
+class Command(BaseCommand):
+    help = 'Import the ranking files into RankingEntry rows for the database rankings backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument("cup", nargs="?", help="Only import this cup")
+        parser.add_argument("cp", nargs="?", help="Only import this league")
+
+    def handle(self, *args, **options):
+        formats = get_registry().formats
+        start = time.perf_counter()
+        imported = 0
+        with transaction.atomic():
+            transaction.on_commit(expire_data_version)
+            for cup, cp, category in scenarios():
+                if options["cup"] and cup != options["cup"] or options["cp"] and cp != options["cp"]:
+                    continue
+                if (cup, cp) not in formats:
+                    self.stderr.write(f"{cup}/{cp}/{category}: unknown format")
+                    continue
+                count = ranking_store.import_ranking(formats[cup, cp], category, load_ranking_file(cup, cp, category))
+                imported += 1
+                self.stdout.write(f"{cup}/{cp}/{category}: {count} entries")
+            DataVersion.bump()
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} rankings in {time.perf_counter() - start:.1f}s"))
@@ -1,90 +1,85 @@
+from contextlib import contextmanager
 from functools import lru_cache
-from django.core.management.base import BaseCommand, CommandError
-from pvp.models import Format, Pokemon, FastMove, ChargedMove, Tag
 import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from pvp.loaders import (DEFAULT_FORMATS, charged_move_fields, fast_move_fields, format_fields, insert_links,
+                         is_fast_move, pokemon_fields, pokemon_links)
+from pvp.cache import expire_data_version
+from pvp.models import DataVersion, Format, Pokemon, FastMove, ChargedMove, Tag
 
 class Command(BaseCommand):
     help = 'Load JSON data'
-    
+
     @lru_cache
     def open_file(self, filename):
         with open(filename) as f:
             return json.load(f)
 
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.stdout.write(f"{name}: {time.perf_counter() - start:.3f}s")
+
     def handle(self, *args, **options):
-        self.load_formats()
-        self.load_moves()
-        self.load_pokemon()
-    
-    @lru_cache
-    def load_formats(self):
-        Format.objects.get_or_create(title="Great League", cup="all", cp=1500, meta="great")
-        Format.objects.get_or_create(title="Ultra League", cup="all", cp=2500, meta="ultra")
-        Format.objects.get_or_create(title="Master League", cup="all", cp=10000, meta="master")
-    
-        format_data = self.open_file("pvp/fixtures/formats.json")
-        for format in format_data:
-            Format.objects.get_or_create(title=format["title"], cup=format.get("cup"), cp=format["cp"], meta=format["meta"], show=format["showFormat"])
-    
-    def create_move(self, m):
-        if m.get('energy') == 0:
-            FastMove.objects.get_or_create(
-                name=m["name"],
-                move_id=m["moveId"],
-                abbreviation=m.get("abbreviation", None),  
-                energy_gain=m["energyGain"],
-                type=m.get("type","none"),
-                power=m.get("power", 0),
-                cooldown=m.get("cooldown",500),
-                )
-        else:
-            ChargedMove.objects.get_or_create(
-                name=m["name"],
-                move_id=m["moveId"],
-                energy=m["energy"],
-                abbreviation=m.get("abbreviation", None),
-                type=m.get("type","none"),
-                power=m.get("power", 0),
-                cooldown=m.get("cooldown",500),
-                buffs=m.get("buffs", None),
-                buff_target=m.get("buffTarget", None),
-                buff_self=m.get("buffsSelf", None),
-                buff_opponent=m.get("buffsOpponent", None),
-                buff_apply_chance=float(m.get("buffApplyChance", 0))
-                )
-    
-    def create_pokemon(self, pokemon):
-        obj, _ = Pokemon.objects.get_or_create(
-            dex=pokemon["dex"],
-            species_name=pokemon["speciesName"],
-            species_id=pokemon["speciesId"],
-            base_stats=pokemon["baseStats"],
-            types=pokemon["types"],
-            elite_moves=pokemon.get("eliteMoves", None),
-            legacy_moves=pokemon.get("legacyMoves", None),
-            level_25CP=pokemon.get("level25CP", None),
-            default_ivs=pokemon.get("defaultIVs", None),
-            buddy_distance=pokemon.get("buddyDistance", None),
-            third_move_cost=pokemon.get("thirdMoveCost", 0),
-            released=pokemon.get("released", False),
-            family=pokemon.get("family", None)
-            )
-        if pokemon.get("released"):
-            fm = [FastMove.objects.get(move_id=move) for move in pokemon.get("fastMoves")]
-            cm = [ChargedMove.objects.get(move_id=m) for m in pokemon.get("chargedMoves")]
-            obj.fast_moves.set(fm)
-            obj.charged_moves.set(cm)
-        obj.tags.set([Tag.objects.create(tag=x) for x in pokemon.get("tags", [])])
-    
-    @lru_cache    
-    def load_pokemon(self):
-        pokemon_data = self.open_file("pvp/fixtures/pokemon.json")
-        for pokemon in pokemon_data:  
-            self.create_pokemon(pokemon)
-              
-    @lru_cache     
-    def load_moves(self):
-        move_data = self.open_file("pvp/fixtures/moves.json")
-        for m in move_data:
-            self.create_move(m)             
-            
\ No newline at end of file
+        start = time.perf_counter()
+        with self.stage("read fixtures"):
+            format_data = self.open_file("pvp/fixtures/formats.json")
+            move_data = self.open_file("pvp/fixtures/moves.json")
+            pokemon_data = self.open_file("pvp/fixtures/pokemon.json")
+        with transaction.atomic():
+            transaction.on_commit(expire_data_version)
+            with self.stage("formats"):
+                self.load_formats(format_data)
+            with self.stage("clear"):
+                self.clear()
+            with self.stage("moves"):
+                fast_moves, charged_moves = self.load_moves(move_data)
+            with self.stage("tags"):
+                tags = self.load_tags(pokemon_data)
+            with self.stage("pokemon"):
+                pokemon = self.load_pokemon(pokemon_data)
+            with self.stage("links"):
+                self.load_links(pokemon_data, pokemon, fast_moves, charged_moves, tags)
+            DataVersion.bump()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(move_data)} moves and {len(pokemon_data)} pokemon in {time.perf_counter() - start:.3f}s"))
+
+    def load_formats(self, format_data):
+        existing = set(Format.objects.values_list("cup", "cp"))
+        new = []
+        for format in DEFAULT_FORMATS + format_data:
+            fields = format_fields(format)
+            if (fields["cup"], fields["cp"]) not in existing:
+                existing.add((fields["cup"], fields["cp"]))
+                new.append(Format(**fields))
+        Format.objects.bulk_create(new)
+
+    def clear(self):
+        # M2M rows go with the pokemon; moves and tags are only referenced through them
+        Pokemon.objects.all().delete()
+        FastMove.objects.all().delete()
+        ChargedMove.objects.all().delete()
+        Tag.objects.all().delete()
+
+    def load_moves(self, move_data):
+        fast = FastMove.objects.bulk_create([FastMove(**fast_move_fields(m)) for m in move_data if is_fast_move(m)])
+        charged = ChargedMove.objects.bulk_create([ChargedMove(**charged_move_fields(m)) for m in move_data if not is_fast_move(m)])
+        return {m.move_id: m.pk for m in fast}, {m.move_id: m.pk for m in charged}
+
+    def load_tags(self, pokemon_data):
+        names = sorted({tag for pokemon in pokemon_data for tag in pokemon.get("tags", [])})
+        return {t.tag: t.pk for t in Tag.objects.bulk_create([Tag(tag=name) for name in names])}
+
+    def load_pokemon(self, pokemon_data):
+        objs = Pokemon.objects.bulk_create([Pokemon(**pokemon_fields(p)) for p in pokemon_data], batch_size=500)
+        return [obj.pk for obj in objs]
+
+    def load_links(self, pokemon_data, pokemon, fast_moves, charged_moves, tags):
+        try:
+            links = pokemon_links(pokemon_data, pokemon, fast_moves, charged_moves, tags)
+        except KeyError as e:
+            raise CommandError(f"Unknown move or tag {e}")
+        insert_links(*links)
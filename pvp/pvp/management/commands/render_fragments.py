@@ -0,0 +1,38 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from pvp.artifacts import scenarios
+from pvp.fragments import fragments_path, open_fragments, render_all
+
+
+class Command(BaseCommand):
+    help = 'Pre-render the ranking rows of every scenario'
+
+    def add_arguments(self, parser):
+        parser.add_argument("cup", nargs="?", help="Only render this cup")
+        parser.add_argument("cp", nargs="?", help="Only render this league")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+        parser.add_argument("--force", action="store_true", help="Rerender fragments that are up to date")
+
+    def handle(self, *args, **options):
+        selected = []
+        for cup, cp, category in scenarios():
+            if options["cup"] and cup != options["cup"] or options["cp"] and cp != options["cp"]:
+                continue
+            if not options["force"] and open_fragments(cup, cp, category) is not None:
+                continue
+            selected.append((cup, cp, category))
+        start = time.perf_counter()
+        rendered = 0
+
+        def progress(scenario, result):
+            nonlocal rendered
+            if isinstance(result, Exception):
+                self.stderr.write(f"{'/'.join(scenario)}: {result!r}")
+            else:
+                rendered += 1
+                self.stdout.write(f"{fragments_path(*scenario)} ({result} bytes)")
+
+        render_all(selected, options["workers"], progress)
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} of {len(selected)} scenarios in {time.perf_counter() - start:.1f}s"))
@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from pvp.loaders import (DEFAULT_FORMATS, charged_move_fields, delete_links, fast_move_fields, format_fields,
+                         insert_links, is_fast_move, open_fixture, pokemon_fields, pokemon_links, record_hash)
+from pvp.cache import expire_data_version
+from pvp.models import DataVersion, Format, Pokemon, FastMove, ChargedMove, Tag
+
+def diff(existing, incoming):
+    """Split keyed records into inserts, updates and deletes.
+
+    ``existing`` maps key -> (pk, hash) and ``incoming`` maps key -> record.
+    """
+    inserts = [key for key in incoming if key not in existing]
+    updates = [key for key, record in incoming.items() if key in existing and existing[key][1] != record_hash(record)]
+    deletes = [key for key in existing if key not in incoming]
+    return inserts, updates, deletes
+
+class Command(BaseCommand):
+    help = 'Apply changes from the gamemaster fixtures without reloading everything'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        gamemaster = open_fixture("gamemaster.json")
+        move_data = open_fixture("moves.json")
+        pokemon_data = open_fixture("pokemon.json")
+        self.dry_run = options["dry_run"]
+        with transaction.atomic():
+            transaction.on_commit(expire_data_version)
+            self.sync_formats(DEFAULT_FORMATS + gamemaster["formats"])
+            recreated = self.sync_moves(move_data)
+            self.sync_pokemon(pokemon_data, recreated)
+            DataVersion.bump()
+            if self.dry_run:
+                transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS(f"Synced in {time.perf_counter() - start:.3f}s"))
+
+    def report(self, name, inserts, updates, deletes):
+        self.stdout.write(f"{name}: {len(inserts)} inserted, {len(updates)} updated, {len(deletes)} deleted")
+
+    def apply(self, model, existing, incoming, fields):
+        """Write the diff for one model and return the inserted objects."""
+        inserts, updates, deletes = diff(existing, incoming)
+        if deletes:
+            model.objects.filter(pk__in=[existing[key][0] for key in deletes]).delete()
+        if updates:
+            objs = [model(pk=existing[key][0], **fields(incoming[key])) for key in updates]
+            model.objects.bulk_update(objs, list(fields(incoming[updates[0]])), batch_size=500)
+        created = model.objects.bulk_create([model(**fields(incoming[key])) for key in inserts], batch_size=500)
+        self.report(model.__name__, inserts, updates, deletes)
+        return created, updates
+
+    def sync_formats(self, format_data):
+        existing = {(f.cup, f.cp): (f.pk, f.content_hash) for f in Format.objects.all()}
+        incoming = {}
+        for format in format_data:
+            incoming.setdefault((format.get("cup"), format["cp"]), format)
+        self.apply(Format, existing, incoming, format_fields)
+
+    def sync_moves(self, move_data):
+        """Sync both move tables and return the ids of moves that got a new primary key."""
+        fast = {m["moveId"]: m for m in move_data if is_fast_move(m)}
+        charged = {m["moveId"]: m for m in move_data if not is_fast_move(m)}
+        created_fast, _ = self.apply(FastMove, {m.move_id: (m.pk, m.content_hash) for m in FastMove.objects.all()}, fast, fast_move_fields)
+        created_charged, _ = self.apply(ChargedMove, {m.move_id: (m.pk, m.content_hash) for m in ChargedMove.objects.all()}, charged, charged_move_fields)
+        return {m.move_id for m in created_fast + created_charged}
+
+    def sync_pokemon(self, pokemon_data, recreated_moves):
+        existing = {p.species_id: (p.pk, p.content_hash) for p in Pokemon.objects.all()}
+        incoming = {p["speciesId"]: p for p in pokemon_data}
+        created, updates = self.apply(Pokemon, existing, incoming, pokemon_fields)
+
+        relink = {key: existing[key][0] for key in updates}
+        relink.update({p.species_id: p.pk for p in created})
+        # a move that moved between the fast and charged tables dropped its links
+        for key, p in incoming.items():
+            if key not in relink and recreated_moves.intersection(p.get("fastMoves", []) + p.get("chargedMoves", [])):
+                relink[key] = existing[key][0]
+        if not relink:
+            return
+
+        tag_names = {t for key in relink for t in incoming[key].get("tags", [])}
+        tags = dict(Tag.objects.values_list("tag", "pk"))
+        missing = sorted(tag_names - tags.keys())
+        tags.update({t.tag: t.pk for t in Tag.objects.bulk_create([Tag(tag=name) for name in missing])})
+        fast_moves = dict(FastMove.objects.values_list("move_id", "pk"))
+        charged_moves = dict(ChargedMove.objects.values_list("move_id", "pk"))
+
+        delete_links(relink.values())
+        try:
+            links = pokemon_links([incoming[key] for key in relink], relink.values(), fast_moves, charged_moves, tags)
+        except KeyError as e:
+            raise CommandError(f"Unknown move or tag {e}")
+        insert_links(*links)
+        Tag.objects.filter(pokemon__isnull=True).delete()
+        self.stdout.write(f"Links: {len(relink)} pokemon relinked")
@@ -0,0 +1,142 @@
+"""Per-request timings and in-process histograms.
+
+The middleware opens a RequestMetrics for each request in a context
+variable; the SQL wrapper, the template backend and the ranking caches add
+to it when one is open and cost a single lookup otherwise.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+# upper bounds in seconds, the last bucket is open ended
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = ("start", "queries", "sql", "templates", "hits", "misses")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.templates = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total) -> str:
+        return ", ".join((
+            f'sql;dur={self.sql * 1000:.1f};desc="{self.queries} queries"',
+            f"tpl;dur={self.templates * 1000:.1f}",
+            f'cache;desc="{self.hits} hits, {self.misses} misses"',
+            f"total;dur={total * 1000:.1f}",
+        ))
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Registry:
+    """Histograms of request time, SQL time and template time per route, plus counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, route, metrics: RequestMetrics, total):
+        with self.lock:
+            for name, value in (("request", total), ("sql", metrics.sql), ("template", metrics.templates)):
+                key = (name, route)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram()
+                self.histograms[key].observe(value)
+            for name, value in (("queries", metrics.queries), ("cache_hits", metrics.hits),
+                                ("cache_misses", metrics.misses)):
+                self.counters[(name, route)] = self.counters.get((name, route), 0) + value
+
+    def exposition(self) -> str:
+        """Prometheus text format."""
+        lines = []
+        with self.lock:
+            for (name, route), histogram in sorted(self.histograms.items()):
+                metric = f"pvp_{name}_seconds"
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{route="{route}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{route="{route}"}} {histogram.count}')
+            for (name, route), value in sorted(self.counters.items()):
+                lines.append(f'pvp_{name}_total{{route="{route}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def begin() -> tuple:
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end(token):
+    _current.reset(token)
+
+
+def cache_lookup(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.hits += 1
+        else:
+            metrics.misses += 1
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql += time.perf_counter() - start
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    # connection_created fires again on reconnects of the same wrapper
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def timed_render(render):
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return render(*args, **kwargs)
+        finally:
+            metrics.templates += time.perf_counter() - start
+    wrapper.timed = True
+    return wrapper
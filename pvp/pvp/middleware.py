@@ -0,0 +1,53 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+
+from pvp import metrics
+
+
+def _install():
+    connection_created.connect(metrics.install_sql_wrapper, dispatch_uid="pvp.metrics.sql")
+    from django.db import connections
+    for connection in connections.all(initialized_only=True):
+        metrics.install_sql_wrapper(None, connection)
+    if not getattr(django_backend.Template.render, "timed", False):
+        django_backend.Template.render = metrics.timed_render(django_backend.Template.render)
+
+
+class MetricsMiddleware:
+    """Report SQL, template and cache work of each request in Server-Timing and the metrics histograms."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        _install()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request_metrics, token = metrics.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end(token)
+        return self.finish(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end(token)
+        return self.finish(request, response, request_metrics)
+
+    def finish(self, request, response, request_metrics):
+        total = request_metrics.elapsed()
+        match = request.resolver_match
+        route = match.route if match else "unmatched"
+        metrics.registry.observe(route, request_metrics, total)
+        response["Server-Timing"] = request_metrics.server_timing(total)
+        return response
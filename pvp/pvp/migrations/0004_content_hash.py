@@ -0,0 +1,33 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pvp", "0003_remove_chargedmove_archetype_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chargedmove",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="fastmove",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="format",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+    ]
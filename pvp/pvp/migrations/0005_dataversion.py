@@ -0,0 +1,22 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pvp", "0004_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataVersion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("counter", models.PositiveIntegerField(default=0)),
+                ("updated", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
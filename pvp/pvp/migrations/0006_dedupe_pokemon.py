@@ -0,0 +1,24 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:50
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def dedupe_species(apps, schema_editor):
+    # the old get_or_create loader could insert a species twice; keep the newest row
+    Pokemon = apps.get_model("pvp", "Pokemon")
+    duplicates = (Pokemon.objects.values("species_id").annotate(n=Count("id"), newest=Max("id"))
+                  .filter(n__gt=1).values_list("species_id", "newest"))
+    for species_id, newest in duplicates:
+        Pokemon.objects.filter(species_id=species_id).exclude(pk=newest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvp', '0005_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_species, migrations.RunPython.noop),
+    ]
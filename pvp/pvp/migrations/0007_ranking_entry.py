@@ -0,0 +1,43 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:54
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvp', '0006_dedupe_pokemon'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pokemon',
+            name='species_id',
+            field=models.CharField(unique=True),
+        ),
+        migrations.CreateModel(
+            name='RankingEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('species_name', models.CharField()),
+                ('rating', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('moveset', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(), size=None)),
+                ('moves', models.JSONField()),
+                ('matchups', models.JSONField()),
+                ('counters', models.JSONField()),
+                ('scores', models.JSONField(blank=True, null=True)),
+                ('stats', models.JSONField(blank=True, null=True)),
+                ('scenario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='pvp.scenario')),
+                ('species', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='pvp.pokemon', to_field='species_id')),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['moveset'], name='ranking_entry_moveset')],
+                'constraints': [models.UniqueConstraint(fields=('scenario', 'position'), name='ranking_entry_position')],
+            },
+        ),
+    ]
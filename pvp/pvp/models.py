@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
-from functools import lru_cache
+from django.contrib.postgres.indexes import GinIndex
+from django.utils import timezone
+
+from pvp.cache import versioned_cache
 
 class Move(models.Model):
     name = models.CharField()
@@ -9,6 +12,7 @@ class Move(models.Model):
     type = models.CharField()
     power = models.IntegerField()
     cooldown = models.IntegerField()
+    content_hash = models.CharField(max_length=40, blank=True, default="")
     
     @property
     def turns(self):
@@ -25,6 +29,7 @@ class FastMove(Move):
             return self.move_id == other.move_id
         elif isinstance(other, str):
             return (self.move_id == other) or (self.name == other)
+    __hash__ = models.Model.__hash__
     
     @property
     def dpt(self):
@@ -74,6 +79,7 @@ class ChargedMove(Move):
             return self.move_id == other.move_id
         elif isinstance(other, str):
             return (self.move_id == other) or (self.name == other)
+    __hash__ = models.Model.__hash__
     
     @property
     def dpe(self):
@@ -119,12 +125,15 @@ class Tag(models.Model):
         return self.tag
     
     def __eq__(self, __value: str) -> bool:
+        if isinstance(__value, Tag):
+            return self.pk == __value.pk
         return self.tag==__value.lower()
+    __hash__ = models.Model.__hash__
     
 class Pokemon(models.Model):
     dex = models.IntegerField()
     species_name = models.CharField()
-    species_id = models.CharField()
+    species_id = models.CharField(unique=True)
     fast_moves = models.ManyToManyField(FastMove)
     charged_moves = models.ManyToManyField(ChargedMove)
     elite_moves = ArrayField(base_field=models.CharField(), blank=True, null=True)
@@ -138,6 +147,7 @@ class Pokemon(models.Model):
     third_move_cost = models.PositiveIntegerField(blank=True, default=0)
     released = models.BooleanField(null=True, blank=True)
     family = models.JSONField(null=True, blank=True)
+    content_hash = models.CharField(max_length=40, blank=True, default="")
     def __str__(self) -> str:
         return self.species_name
     
@@ -180,14 +190,18 @@ class Format(models.Model):
     cp = models.PositiveSmallIntegerField()
     meta = models.CharField(max_length=32)
     show = models.BooleanField(default=True)
+    content_hash = models.CharField(max_length=40, blank=True, default="")
     
     def __str__(self) -> str:
         return self.title
     
-    @lru_cache
     def get_absolute_url(self):
-        from django.urls import reverse
-        return reverse("rankings", kwargs={"format": self.cup, "cp": self.cp})
+        return rankings_url(self.cup, self.cp)
+
+@versioned_cache(maxsize=256)
+def rankings_url(cup, cp):
+    from django.urls import reverse
+    return reverse("rankings", kwargs={"format": cup, "cp": cp})
     
 class Scenario(models.Model):
     category = models.CharField()
@@ -198,4 +212,43 @@ class Scenario(models.Model):
     
     def get_absolute_url(self):
         from django.urls import reverse
-        return self.format.get_absolute_url()+self.category
\ No newline at end of file
+        return self.format.get_absolute_url()+self.category
+
+class RankingEntry(models.Model):
+    """One row of a published ranking, for the database rankings backend (see pvp.ranking_store)."""
+    scenario = models.ForeignKey(Scenario, on_delete=models.CASCADE, related_name="entries")
+    position = models.PositiveIntegerField()
+    # the loaders recreate pokemon rows, so entries point at the stable species id without a constraint
+    species = models.ForeignKey(Pokemon, to_field="species_id", db_constraint=False, on_delete=models.DO_NOTHING, related_name="+")
+    species_name = models.CharField()
+    rating = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    moveset = ArrayField(base_field=models.CharField())
+    moves = models.JSONField()
+    matchups = models.JSONField()
+    counters = models.JSONField()
+    scores = models.JSONField(null=True, blank=True)
+    stats = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["scenario", "position"], name="ranking_entry_position")]
+        indexes = [GinIndex(fields=["moveset"], name="ranking_entry_moveset")]
+
+class DataVersion(models.Model):
+    """Single-row counter bumped by the data loaders so every worker notices new data."""
+    counter = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def current(cls) -> int:
+        return cls.objects.filter(pk=1).values_list("counter", flat=True).first() or 0
+
+    @classmethod
+    def state(cls):
+        """(counter, updated) in one query; (0, None) before the first load."""
+        return cls.objects.filter(pk=1).values_list("counter", "updated").first() or (0, None)
+
+    @classmethod
+    def bump(cls):
+        cls.objects.get_or_create(pk=1)
+        cls.objects.filter(pk=1).update(counter=models.F("counter") + 1, updated=timezone.now())
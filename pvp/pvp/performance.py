@@ -0,0 +1,130 @@
+"""Cross-category performance of the species of a format.
+
+The rankings of a cup and CP are split over one file per category. The
+performance index joins them once into a struct of arrays: the sorted
+species ids and, per category, each species' score and position
+(0 where it isn't ranked). It is saved as
+``artifacts/performance/<cup>/rankings-<cp>.npz`` by ``manage.py
+build_artifacts``, which rebuilds it when it is older than one of its
+category fixtures, so the stats tab and the cross-category filters read
+one small file instead of seven rankings.
+"""
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from pvp.artifacts import fixture_path
+from pvp.cache import versioned_cache
+from pvp.engine.rankings import CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+PERFORMANCE_DIR = Path("pvp/artifacts/performance")
+
+
+def performance_path(format, cp) -> Path:
+    return PERFORMANCE_DIR / format / f"rankings-{cp}.npz"
+
+
+class PerformanceIndex:
+    """Score and position of every species of a format in every category."""
+
+    def __init__(self, species, scores, positions):
+        self.species = species
+        self.scores = scores
+        self.positions = positions
+        self.rows = {s: i for i, s in enumerate(species.tolist())}
+        self.columns = {c: i for i, c in enumerate(CATEGORIES)}
+
+    def __len__(self):
+        return len(self.species)
+
+    def __contains__(self, species_id):
+        return species_id in self.rows
+
+    def scores_of(self, species_id) -> dict:
+        """Category -> score of ``species_id``, for the categories it is ranked in."""
+        row = self.rows.get(species_id)
+        if row is None:
+            return {}
+        return {c: float(self.scores[row, i]) for c, i in self.columns.items() if self.positions[row, i]}
+
+    def positions_of(self, species_id) -> dict:
+        row = self.rows.get(species_id)
+        if row is None:
+            return {}
+        return {c: int(self.positions[row, i]) for c, i in self.columns.items() if self.positions[row, i]}
+
+    def top(self, category, n) -> np.ndarray:
+        """Mask of the species ranked in the top ``n`` of ``category``."""
+        positions = self.positions[:, self.columns[category]]
+        return (positions > 0) & (positions <= n)
+
+    def within(self, category, limits) -> np.ndarray:
+        """Sorted positions in ``category`` of the species in the top n of every (category, n) of ``limits``."""
+        mask = self.positions[:, self.columns[category]] > 0
+        for other, n in limits:
+            mask &= self.top(other, n)
+        return np.sort(self.positions[mask, self.columns[category]])
+
+
+def build_index(format, cp) -> PerformanceIndex:
+    from pvp.views.rankings import load_ranking_context
+    rankings = {}
+    for category in CATEGORIES:
+        if fixture_path(format, cp, category).exists():
+            rankings[category] = load_ranking_context(format, cp, category)
+    species = np.array(sorted({item["speciesId"] for items in rankings.values() for item in items}), dtype=str)
+    rows = {s: i for i, s in enumerate(species.tolist())}
+    scores = np.zeros((len(species), len(CATEGORIES)), dtype=np.float64)
+    positions = np.zeros((len(species), len(CATEGORIES)), dtype=np.int32)
+    for column, category in enumerate(CATEGORIES):
+        for position, item in enumerate(rankings.get(category, ()), 1):
+            scores[rows[item["speciesId"]], column] = item["score"]
+            positions[rows[item["speciesId"]], column] = position
+    return PerformanceIndex(species, scores, positions)
+
+
+def write_index(format, cp, target: Path = None) -> int:
+    index = build_index(format, cp)
+    target = target or performance_path(format, cp)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as file:
+        np.savez(file, categories=np.array(CATEGORIES), species=index.species, scores=index.scores,
+                 positions=index.positions)
+    os.replace(tmp, target)
+    return target.stat().st_size
+
+
+def is_stale(format, cp) -> bool:
+    """Whether the saved index is missing or older than one of its category fixtures."""
+    try:
+        mtime = performance_path(format, cp).stat().st_mtime
+    except FileNotFoundError:
+        return True
+    sources = [fixture_path(format, cp, c) for c in CATEGORIES]
+    return any(p.exists() and p.stat().st_mtime > mtime for p in sources)
+
+
+def _load(path):
+    with np.load(path) as data:
+        if data["categories"].tolist() != CATEGORIES:
+            return None
+        return PerformanceIndex(data["species"], data["scores"], data["positions"])
+
+
+@versioned_cache(maxsize=32)
+def get_performance_index(format, cp) -> PerformanceIndex:
+    """The saved index of a format, opened read-only.
+
+    Until build_artifacts has built an up to date one, the index is joined in memory
+    from the category rankings and nothing is written.
+    """
+    index = None if is_stale(format, cp) else _load(performance_path(format, cp))
+    if index is None:
+        logger.warning("Performance index for %s %s is missing or out of date, run manage.py build_artifacts", format, cp)
+        index = build_index(format, cp)
+    return index
@@ -0,0 +1,119 @@
+"""Rankings stored in the database, an alternative to the fixture and artifact files.
+
+With ``RANKINGS_BACKEND = "database"`` the rankings are read from
+RankingEntry rows (imported with ``manage.py import_rankings``), so
+workers keep no ranking in memory and every node reads the same rows.
+A ranking is a lazy sequence: pages are fetched by position ranges on the
+(scenario, position) index.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from pvp.artifacts import _number
+from pvp.loaders import copy_rows
+from pvp.models import Format, RankingEntry, Scenario
+
+FIELDS = ("species_id", "species_name", "rating", "score", "moveset", "moves", "matchups", "counters",
+          "scores", "stats", "position")
+# rows fetched per query when a whole ranking is iterated
+BATCH_SIZE = 500
+
+
+def enabled() -> bool:
+    return getattr(settings, "RANKINGS_BACKEND", "files") == "database"
+
+
+def _item(row) -> dict:
+    species_id, name, rating, score, moveset, moves, matchups, counters, scores, stats, position = row
+    item = {
+        "speciesId": species_id,
+        "speciesName": name,
+        "rating": rating,
+        "matchups": matchups,
+        "counters": counters,
+        "moves": moves,
+        "moveset": moveset,
+        "score": _number(score),
+    }
+    if scores is not None:
+        item["scores"] = scores
+    if stats is not None:
+        item["stats"] = stats
+    item["position"] = position
+    return item
+
+
+class StoredRanking:
+    """Read-only sequence over the entries of a scenario; items are fetched on access."""
+
+    def __init__(self, scenario_id, size):
+        self.scenario_id = scenario_id
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def _range(self, start, stop) -> list:
+        # positions are 1..size, so a slice is a range scan on the index
+        rows = (RankingEntry.objects.filter(scenario_id=self.scenario_id, position__gt=start, position__lte=stop)
+                .order_by("position").values_list(*FIELDS))
+        return [_item(row) for row in rows]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            items = self._range(start, stop) if stop > start else []
+            return items[::step] if step != 1 else items
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("ranking index out of range")
+        return self._range(index, index + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, self.size, BATCH_SIZE):
+            yield from self._range(start, start + BATCH_SIZE)
+
+    def index_rows(self) -> list:
+        """Id, name, moveset and position of every item, all the search index reads, in one query."""
+        rows = (RankingEntry.objects.filter(scenario_id=self.scenario_id).order_by("position")
+                .values_list("position", "species_id", "species_name", "moveset"))
+        return [{"speciesId": species_id, "speciesName": name, "moveset": moveset, "position": position}
+                for position, species_id, name, moveset in rows]
+
+    def take(self, positions) -> list:
+        """Items at the given positions, in that order, in one query."""
+        positions = [int(p) for p in positions]
+        rows = RankingEntry.objects.filter(scenario_id=self.scenario_id, position__in=positions).values_list(*FIELDS)
+        items = {row[-1]: _item(row) for row in rows}
+        return [items[p] for p in positions]
+
+
+def open_stored_ranking(format, cp, category):
+    """The stored ranking of a scenario, or None if it was never imported."""
+    scenario = (Scenario.objects.filter(format__cup=format, format__cp=cp, category=category)
+                .values_list("pk", flat=True).first())
+    if scenario is None:
+        return None
+    size = RankingEntry.objects.filter(scenario_id=scenario).count()
+    return StoredRanking(scenario, size) if size else None
+
+
+def _row(item, scenario_id, position):
+    return (scenario_id, position, item["speciesId"], item["speciesName"], item["rating"], item["score"],
+            item["moveset"], item["moves"], item["matchups"], item["counters"], item.get("scores"), item.get("stats"))
+
+
+@transaction.atomic
+def import_ranking(format_record, category, rankings) -> int:
+    """Replace the stored entries of a scenario with ``rankings``."""
+    format, _ = Format.objects.get_or_create(cup=format_record.cup, cp=format_record.cp, defaults={
+        "title": format_record.title, "meta": format_record.meta, "show": format_record.show,
+    })
+    scenario, _ = Scenario.objects.get_or_create(format=format, category=category)
+    RankingEntry.objects.filter(scenario=scenario).delete()
+    columns = ["scenario", "position", "species", "species_name", "rating", "score", "moveset", "moves",
+               "matchups", "counters", "scores", "stats"]
+    copy_rows(RankingEntry, [f"{c}_id" if c in ("scenario", "species") else c for c in columns],
+              (_row(item, scenario.pk, position) for position, item in enumerate(rankings, 1)))
+    return len(rankings)
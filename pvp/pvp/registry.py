@@ -0,0 +1,210 @@
+import threading
+from functools import cached_property
+
+from pvp import ranking_store
+from pvp.artifacts import RANKINGS_DIR, scenarios
+from pvp.cache import data_version
+from pvp.engine.eligibility import CupIndex, SpeciesColumns
+from pvp.engine.movecounts import MoveCounts
+from pvp.engine.rankings import CATEGORIES
+from pvp.loaders import open_fixture
+from pvp.models import ChargedMove, FastMove, Format, Pokemon, Scenario, rankings_url
+
+LEAGUES = {500: "Little League", 1500: "Great League", 2500: "Ultra League", 10000: "Master League"}
+
+
+class Record:
+    """Immutable, slotted snapshot of a model row."""
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self):
+        return f"<{type(self).__name__}: {self}>"
+
+
+class FastMoveRecord(Record):
+    __slots__ = ("move_id", "name", "abbreviation", "type", "power", "cooldown", "energy_gain",
+                 "turns", "dpt", "ept", "archetype", "archetype_class")
+
+    @classmethod
+    def from_model(cls, move: FastMove):
+        return cls(
+            move_id=move.move_id, name=move.name, abbreviation=move.abbreviation, type=move.type,
+            power=move.power, cooldown=move.cooldown, energy_gain=move.energy_gain, turns=move.turns,
+            dpt=move.dpt, ept=move.ept, archetype=move.archetype, archetype_class=move.archetype_class,
+        )
+
+    def __str__(self):
+        return self.name
+
+
+class ChargedMoveRecord(Record):
+    __slots__ = ("move_id", "name", "abbreviation", "type", "power", "cooldown", "energy", "buffs",
+                 "buff_target", "buff_self", "buff_opponent", "buff_apply_chance", "dpe",
+                 "archetype", "archetype_class")
+
+    @classmethod
+    def from_model(cls, move: ChargedMove):
+        return cls(
+            move_id=move.move_id, name=move.name, abbreviation=move.abbreviation, type=move.type,
+            power=move.power, cooldown=move.cooldown, energy=move.energy,
+            buffs=tuple(move.buffs) if move.buffs else None, buff_target=move.buff_target,
+            buff_self=tuple(move.buff_self) if move.buff_self else None,
+            buff_opponent=tuple(move.buff_opponent) if move.buff_opponent else None,
+            buff_apply_chance=move.buff_apply_chance, dpe=move.dpe,
+            archetype=move.archetype, archetype_class=move.archetype_class,
+        )
+
+    def __str__(self):
+        return self.name
+
+
+class SpeciesRecord(Record):
+    __slots__ = ("species_id", "species_name", "dex", "types", "type1", "type2", "tags", "fast_moves",
+                 "charged_moves", "elite_moves", "legacy_moves", "base_stats", "default_ivs",
+                 "level_25CP", "buddy_distance", "third_move_cost", "released", "family", "is_shadow")
+
+    @classmethod
+    def from_model(cls, pokemon: Pokemon, fast_moves, charged_moves):
+        tags = frozenset(t.tag for t in pokemon.tags.all())
+        return cls(
+            species_id=pokemon.species_id, species_name=pokemon.species_name, dex=pokemon.dex,
+            types=tuple(pokemon.types), type1=pokemon.type1, type2=pokemon.type2, tags=tags,
+            fast_moves=tuple(fast_moves[m.move_id] for m in pokemon.fast_moves.all()),
+            charged_moves=tuple(charged_moves[m.move_id] for m in pokemon.charged_moves.all()),
+            elite_moves=frozenset(pokemon.elite_moves or ()),
+            legacy_moves=frozenset(pokemon.legacy_moves or ()),
+            base_stats=pokemon.base_stats, default_ivs=pokemon.default_ivs,
+            level_25CP=pokemon.level_25CP, buddy_distance=pokemon.buddy_distance,
+            third_move_cost=pokemon.third_move_cost, released=pokemon.released, family=pokemon.family,
+            is_shadow="shadow" in tags,
+        )
+
+    def __str__(self):
+        return self.species_name
+
+    def is_elite(self, move):
+        return move.move_id in self.elite_moves
+
+    def is_legacy(self, move):
+        return move.move_id in self.legacy_moves
+
+    def has_tag(self, tag):
+        return tag.lower() in self.tags
+
+    @property
+    def has_elite_moves(self):
+        return len(self.elite_moves) > 0
+
+    @property
+    def has_legacy_moves(self):
+        return len(self.legacy_moves) > 0
+
+
+class FormatRecord(Record):
+    __slots__ = ("title", "cup", "cp", "meta", "show")
+
+    @classmethod
+    def from_model(cls, format: Format):
+        return cls(title=format.title, cup=format.cup, cp=format.cp, meta=format.meta, show=format.show)
+
+    def __str__(self):
+        return self.title
+
+    def get_absolute_url(self):
+        return rankings_url(self.cup, self.cp)
+
+
+class ScenarioRecord(Record):
+    __slots__ = ("format", "category")
+
+    def __str__(self):
+        return self.format.title
+
+    def get_absolute_url(self):
+        return self.format.get_absolute_url() + self.category
+
+
+def cup_formats(known) -> list:
+    """Hidden formats for the gamemaster cups that have rankings on disk but no Format row."""
+    cups = {cup["name"]: cup for cup in open_fixture("gamemaster.json")["cups"]}
+    formats = []
+    for path in sorted(RANKINGS_DIR.glob("*/overall/rankings-*.json")):
+        name, cp = path.parts[-3], int(path.stem.split("-")[1])
+        if (name, str(cp)) in known or name not in cups:
+            continue
+        title = f"{cups[name].get('title', name)} ({LEAGUES.get(cp, cp)})"
+        formats.append(FormatRecord(title=title, cup=name, cp=cp, meta=name, show=False))
+    return formats
+
+
+class Registry:
+    """Species and moves keyed by species_id/move_id, loaded in a handful of queries."""
+
+    def __init__(self, version=None):
+        self.version = version
+        self.fast_moves = {m.move_id: FastMoveRecord.from_model(m) for m in FastMove.objects.all()}
+        self.charged_moves = {m.move_id: ChargedMoveRecord.from_model(m) for m in ChargedMove.objects.all()}
+        self.species = {
+            p.species_id: SpeciesRecord.from_model(p, self.fast_moves, self.charged_moves)
+            for p in Pokemon.objects.prefetch_related("fast_moves", "charged_moves", "tags")
+        }
+        self.formats = {(f.cup, str(f.cp)): FormatRecord.from_model(f) for f in Format.objects.order_by("pk")}
+        self.formats.update({(f.cup, str(f.cp)): f for f in cup_formats(self.formats)})
+        # only scenarios with rankings to serve: a fixture on disk, or imported entries for the database backend
+        available = set(scenarios())
+        if ranking_store.enabled():
+            available.update((cup, str(cp), category) for cup, cp, category in
+                             Scenario.objects.filter(entries__isnull=False).distinct()
+                             .values_list("format__cup", "format__cp", "category"))
+        self.scenarios = {
+            (cup, cp, category): ScenarioRecord(format=self.formats[(cup, cp)], category=category)
+            for cup, cp, category in sorted(available) if (cup, cp) in self.formats and category in CATEGORIES
+        }
+
+    def scenario(self, cup, cp, category) -> ScenarioRecord | None:
+        """URL -> scenario resolution; None for unknown formats and categories."""
+        return self.scenarios.get((cup, str(cp), category))
+
+    @property
+    def shown_formats(self) -> list:
+        return [f for f in self.formats.values() if f.show and (f.cup, str(f.cp), "overall") in self.scenarios]
+
+    @cached_property
+    def move_counts(self) -> MoveCounts:
+        return MoveCounts(self.fast_moves, self.charged_moves)
+
+    @cached_property
+    def cup_index(self) -> CupIndex:
+        return CupIndex(SpeciesColumns(self.species), open_fixture("gamemaster.json")["cups"])
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def get_registry() -> Registry:
+    """Return the registry for the current data version, reloading it if the data changed."""
+    version = data_version()
+    registry = _registry
+    if registry is None or registry.version != version:
+        with _lock:
+            registry = _registry
+            if registry is None or registry.version != version:
+                registry = reload(version)
+    return registry
+
+
+def reload(version=None) -> Registry:
+    """Rebuild the registry from the database."""
+    global _registry
+    # build first and swap the reference so readers never see a half-loaded registry
+    registry = Registry(version or data_version())
+    _registry = registry
+    return registry
@@ -0,0 +1,139 @@
+import bisect
+from collections import defaultdict
+
+import numpy as np
+
+from pvp.cache import versioned_cache
+from pvp.engine.rankings import CATEGORIES
+from pvp.performance import get_performance_index
+from pvp.registry import get_registry
+
+# items read per step when a selection is iterated
+BATCH_SIZE = 500
+
+
+class RankingIndex:
+    """Inverted indexes over one ranking: posting lists of positions per type, move and tag, plus names."""
+
+    def __init__(self, rankings, registry):
+        types, moves, tags = defaultdict(list), defaultdict(list), defaultdict(list)
+        names = []
+        for position, item in enumerate(rankings, 1):
+            species = registry.species.get(item["speciesId"])
+            if species is not None:
+                for t in species.types:
+                    if t != "none":
+                        types[t].append(position)
+                for tag in species.tags:
+                    tags[tag].append(position)
+            for move in item["moveset"]:
+                moves[move].append(position)
+            names.append((item["speciesName"].lower(), position))
+            names.append((item["speciesId"].lower(), position))
+        self.size = len(rankings)
+        self.types = {k: np.array(v, dtype=np.int32) for k, v in types.items()}
+        self.moves = {k: np.array(v, dtype=np.int32) for k, v in moves.items()}
+        self.tags = {k: np.array(v, dtype=np.int32) for k, v in tags.items()}
+        names.sort()
+        self.names = [n for n, _ in names]
+        self.name_positions = np.array([p for _, p in names], dtype=np.int32)
+
+    def prefix(self, text) -> np.ndarray:
+        text = text.lower()
+        lo = bisect.bisect_left(self.names, text)
+        hi = bisect.bisect_left(self.names, text + "\uffff")
+        return np.unique(self.name_positions[lo:hi])
+
+    def _union(self, index, keys):
+        lists = [index.get(k, np.empty(0, dtype=np.int32)) for k in keys]
+        return lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+
+    def search(self, types=(), moves=(), tags=(), name="") -> np.ndarray | None:
+        """Sorted positions matching every given filter (values within one filter are alternatives).
+
+        None means no filter was given.
+        """
+        postings = []
+        if types:
+            postings.append(self._union(self.types, [t.lower() for t in types]))
+        if moves:
+            postings.append(self._union(self.moves, [m.upper() for m in moves]))
+        if tags:
+            postings.append(self._union(self.tags, [t.lower() for t in tags]))
+        if name:
+            postings.append(self.prefix(name))
+        if not postings:
+            return None
+        postings.sort(key=len)
+        result = postings[0]
+        for posting in postings[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+
+
+class Selection:
+    """Sequence of the ranking items at ``positions``, read lazily so pages only decode their rows."""
+
+    def __init__(self, rankings, positions):
+        self.rankings = rankings
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if hasattr(self.rankings, "take"):
+                return self.rankings.take(self.positions[index])
+            return [self.rankings[int(p) - 1] for p in self.positions[index]]
+        return self.rankings[int(self.positions[index]) - 1]
+
+    def __iter__(self):
+        for start in range(0, len(self.positions), BATCH_SIZE):
+            yield from self[start:start + BATCH_SIZE]
+
+    def index_after(self, position) -> int:
+        """Index of the first selected item ranked below ``position``."""
+        return int(np.searchsorted(self.positions, position, side="right"))
+
+
+@versioned_cache(maxsize=32)
+def get_ranking_index(format, cp, category) -> RankingIndex:
+    from pvp.views.rankings import load_ranking_context
+    rankings = load_ranking_context(format, cp, category)
+    if hasattr(rankings, "index_rows"):
+        # stored rankings would fetch every column, matchups and moves included
+        rankings = rankings.index_rows()
+    return RankingIndex(rankings, get_registry())
+
+
+def _limits(values) -> list:
+    limits = []
+    for value in values:
+        category, _, n = value.partition(":")
+        if category in CATEGORIES and n.isdigit():
+            limits.append((category, int(n)))
+    return limits
+
+
+def filter_params(request) -> dict:
+    """Filters of a rankings request: ?type=steel,fairy&move=COUNTER&tag=shadow&q=med&top=leads:50."""
+    def values(name):
+        return [v for v in request.GET.get(name, "").split(",") if v]
+    return {"types": values("type"), "moves": values("move"), "tags": values("tag"), "name": request.GET.get("q", "").strip(),
+            "top": _limits(values("top"))}
+
+
+def filter_rankings(rankings, format, cp, category, filters):
+    if not any(filters.values()):
+        return rankings
+    filters = dict(filters)
+    top = filters.pop("top", None)
+    positions = get_ranking_index(format, cp, category).search(**filters)
+    if top:
+        # species in the top n of other categories, e.g. closers that are also top 50 leads
+        within = get_performance_index(format, cp).within(category, top)
+        positions = within if positions is None else np.intersect1d(positions, within, assume_unique=True)
+    return rankings if positions is None else Selection(rankings, positions)
@@ -74,6 +74,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_htmx.middleware.HtmxMiddleware",
+    "pvp.middleware.MetricsMiddleware",
 ]
 
 ROOT_URLCONF = "pvp.urls"
@@ -157,3 +158,23 @@ STATICFILES_FINDERS = (
 STATIC_ROOT = BASE_DIR / "pvp/static"
 
 COMPRESS_ENABLED = True
+
+# Seconds between checks of the data version (fixture mtimes and the DataVersion counter)
+# that the memoized ranking and template caches are keyed on
+DATA_VERSION_TTL = 5
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+}
+# Seconds a rendered ranking fragment stays cached; keys include the data version
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Where rankings are read from: "files" (fixtures and built artifacts) or "database"
+# (RankingEntry rows written by `manage.py import_rankings`)
+RANKINGS_BACKEND = "files"
+
+# Addresses allowed to scrape /metrics/ besides signed-in staff; nobody else gets past a 404
+METRICS_ALLOWED_IPS = []
@@ -1,53 +1,37 @@
-from functools import lru_cache
-import math
-
 from django import template
-from ..models import ChargedMove, FastMove, Pokemon  
+from ..cache import versioned_cache
+from ..engine import ivs, teams, typechart
+from ..performance import get_performance_index
+from ..registry import ChargedMoveRecord, FastMoveRecord, SpeciesRecord, get_registry
 
 register = template.Library()
 
-@lru_cache
 @register.filter
-def get_fast_move(id:str) -> FastMove:
-    return FastMove.objects.get(move_id=id)
+def get_fast_move(id:str) -> FastMoveRecord:
+    return get_registry().fast_moves[id]
 
-@lru_cache
 @register.filter
-def get_charged_move(id:str) -> ChargedMove:
-    return ChargedMove.objects.get(move_id=id)
+def get_charged_move(id:str) -> ChargedMoveRecord:
+    return get_registry().charged_moves[id]
 
 @register.filter
-def n_move_count(fast_move:FastMove, charged_move:ChargedMove, n:int):
+def n_move_count(fast_move:FastMoveRecord, charged_move:ChargedMoveRecord, n:int):
     if n == 0:
         return 0
-    if n == 1:
-        return math.ceil(charged_move.energy / fast_move.energy_gain)
-    total_count = math.ceil((charged_move.energy * n) / fast_move.energy_gain)
-    for i in range(n):
-        total_count -= n_move_count(fast_move, charged_move, n-1)
-    return  total_count
+    return get_registry().move_counts(fast_move.move_id, charged_move.move_id)[n-1]
     
-@lru_cache
-@register.filter  
-def move_count(fm:str, cm:str) -> list[int]:
-    fast_move = get_fast_move(fm)
-    charged_move = get_charged_move(cm)
-    return [n_move_count(fast_move, charged_move, n+1) for n in range(3)]
+@register.filter
+def move_count(fm:str, cm:str) -> tuple[int]:
+    return get_registry().move_counts(fm, cm)
 
-@lru_cache
 @register.filter
+@versioned_cache(maxsize=4096)
 def charged_move_str(fm:str, cm:str) -> str:
     charged_move = get_charged_move(cm)
-    mc = move_count(fm, cm)
-    cm_count = str(mc[0])
-    if mc[0] > mc[1]:
-        cm_count += '-'
-    if (mc[2] < mc[1]) and (mc[0]==mc[1]):
-        cm_count += '.'
-    return f', {charged_move.name}<span class="count">{cm_count}</span>'
-
-@lru_cache
+    return f', {charged_move.name}<span class="count">{get_registry().move_counts.suffix(fm, cm)}</span>'
+
 @register.filter
+@versioned_cache(maxsize=4096)
 def move_str(moveset: list[str]) -> str:
     fast_move = get_fast_move(moveset[0])
     move_str = f'<div class="moves">{fast_move.name}<span class="count fast">{int(fast_move.turns)}</span>'
@@ -58,28 +42,45 @@ def move_str(moveset: list[str]) -> str:
     move_str += '</div>'
     return move_str
 
-@lru_cache
 @register.filter
-def get_pokemon(id:str) -> Pokemon:
-    return Pokemon.objects.get(species_id=id)
+def get_pokemon(id:str) -> SpeciesRecord:
+    return get_registry().species[id]
 
-@lru_cache
 @register.filter
 def type1(id:str) -> str:
     return get_pokemon(id).type1
 
-@lru_cache
 @register.filter
 def type2(id:str) -> str:
     return get_pokemon(id).type2
 
-@lru_cache
 @register.filter
 def name(id:str) -> str:
     return get_pokemon(id).species_name
 
-@lru_cache
+@register.simple_tag
+def rank_one(id:str, cp:str):
+    table = ivs.get_table(int(cp))
+    return table.top(id)[0] if table is not None and id in table else None
+
+@register.simple_tag
+def performance(id:str, cup:str, cp:str) -> dict:
+    return get_performance_index(cup, cp).scores_of(id)
+
+@register.simple_tag
+def suggested_teammates(id:str, cup:str, cp:str) -> list:
+    return [get_pokemon(s) for s in teams.suggested_teammates(cup, cp, id)]
+
+@register.filter
+def weaknesses(id:str) -> tuple:
+    return typechart.weaknesses(get_pokemon(id).types)
+
 @register.filter
+def resistances(id:str) -> tuple:
+    return typechart.resistances(get_pokemon(id).types)
+
+@register.filter
+@versioned_cache(maxsize=4096)
 def rating(rating:int) -> str:
     if rating == 500:
         return "tie"
@@ -92,9 +93,9 @@ def rating(rating:int) -> str:
     else:
         return "win"
 
-@lru_cache
-@register.simple_tag    
-def get_fast_move_info(move:FastMove, pokemon:Pokemon):
+@register.simple_tag
+@versioned_cache(maxsize=4096)
+def get_fast_move_info(move:FastMoveRecord, pokemon:SpeciesRecord):
     if move.type==pokemon.type1 or move.type==pokemon.type2:
         stab_mul = 1.2
     else:
@@ -119,9 +120,9 @@ def get_fast_move_info(move:FastMove, pokemon:Pokemon):
         "turns": move.turns
     }
 
-@lru_cache
 @register.simple_tag
-def get_charged_move_info(move:ChargedMove, pokemon:Pokemon):
+@versioned_cache(maxsize=4096)
+def get_charged_move_info(move:ChargedMoveRecord, pokemon:SpeciesRecord):
     archetype = move.archetype
     if move.type==pokemon.type1 or move.type==pokemon.type2:
         stab_mul = 1.2
@@ -158,20 +159,22 @@ def get_charged_move_info(move:ChargedMove, pokemon:Pokemon):
         "archetype": archetype
     }
     
-@lru_cache
 @register.simple_tag
-def move_cycle_info(fast_move:FastMove, charged_move:ChargedMove, pokemon:Pokemon):
+@versioned_cache(maxsize=4096)
+def move_cycle_info(fast_move:FastMoveRecord, charged_move:ChargedMoveRecord, pokemon:SpeciesRecord):
     fm_info = get_fast_move_info(fast_move, pokemon)
     cm_info = get_charged_move_info(charged_move, pokemon)
-    fast_dmg = n_move_count(fast_move, charged_move, 1) * fm_info.dmg
-    total_dmg = fast_dmg + cm_info.dmg
-    cycle_duration = (n_move_count(fast_move, charged_move, 1) * fast_move.turns) + 1
+    counts = get_registry().move_counts(fast_move.move_id, charged_move.move_id)
+    fast_dmg = counts[0] * fm_info["dmg"]
+    total_dmg = fast_dmg + cm_info["dmg"]
+    time_first = counts[0] * fast_move.turns
+    cycle_duration = time_first + 1
     return {
-        "fast_move_count": [n_move_count(fast_move, charged_move, n+1) for n in range(3)],
-        "time_first": n_move_count(fast_move, charged_move, 1) * fast_move.turns,
-        "fast_dmg": n_move_count(fast_move, charged_move, 1) * fm_info.dmg,
-        "charged_dmg": cm_info.dmg,
+        "fast_move_count": list(counts),
+        "time_first": time_first,
+        "fast_dmg": fast_dmg,
+        "charged_dmg": cm_info["dmg"],
         "total_dmg": total_dmg,
         "duration": cycle_duration, 
         "total_dpt": total_dmg/cycle_duration
-    }
\ No newline at end of file
+    }
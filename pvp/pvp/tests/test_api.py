@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+
+from pvp.views.rankings import load_ranking_context
+
+URL = "/api/rankings/all/1500/overall/"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def testserver():
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        yield
+
+
+@pytest.fixture(scope="module")
+def rankings():
+    try:
+        return load_ranking_context("all", "1500", "overall")
+    except FileNotFoundError:
+        pytest.skip("no all/1500 rankings loaded")
+
+
+def pages(url):
+    client = Client()
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        data = response.json()
+        yield data
+        url = data["next"]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 500])
+def test_keyset_paging(rankings, limit):
+    seen = [item for page in pages(f"{URL}?limit={limit}&fields=speciesId,position") for item in page["results"]]
+    assert seen == [{"speciesId": item["speciesId"], "position": item["position"]} for item in rankings]
+
+
+def test_after(rankings):
+    data = next(pages(f"{URL}?after=10&limit=5"))
+    assert [item["position"] for item in data["results"]] == [11, 12, 13, 14, 15]
+    assert data["count"] == len(rankings)
+    assert "after=15" in data["next"]
+    last = next(pages(f"{URL}?after={len(rankings) - 1}"))
+    assert [item["position"] for item in last["results"]] == [len(rankings)]
+    assert last["next"] is None
+
+
+def test_filtered_paging(rankings):
+    first = [item for page in pages(f"{URL}?type=steel&limit=3&fields=position") for item in page["results"]]
+    positions = [item["position"] for item in first]
+    assert positions == sorted(positions)
+    assert len(first) == next(pages(f"{URL}?type=steel"))["count"]
+    # the keyset is the position: a page after a position that isn't selected starts at the next selected one
+    after = positions[len(positions) // 2] - 1 if positions else 0
+    data = next(pages(f"{URL}?type=steel&after={after}&fields=position"))
+    assert [item["position"] for item in data["results"]] == [p for p in positions if p > after][:50]
+
+
+def test_stream(rankings):
+    response = Client().get(f"{URL}?stream=1&fields=speciesId")
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{"speciesId": item["speciesId"]} for item in rankings]
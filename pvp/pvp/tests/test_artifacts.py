@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from pvp import artifacts
+from pvp.artifacts import RankingArtifact, encode, scenarios, write_artifact
+
+
+@pytest.mark.parametrize("scenario", [("all", "1500", "overall"), ("all", "1500", "leads")])
+def test_round_trip(tmp_path, scenario):
+    source = artifacts.fixture_path(*scenario)
+    if not source.exists():
+        pytest.skip(f"no fixture for {scenario}")
+    target = tmp_path / "rankings.bin"
+    write_artifact(source, target)
+    with open(source) as file:
+        items = json.load(file)
+    artifact = RankingArtifact(target)
+    assert len(artifact) == len(items)
+    assert list(artifact) == [{**item, "position": i} for i, item in enumerate(items, 1)]
+    assert artifact[-1] == artifact[len(items) - 1]
+    assert artifact[1:4] == list(artifact)[1:4]
+
+
+def test_every_fixture_encodes():
+    for scenario in scenarios():
+        with open(artifacts.fixture_path(*scenario)) as file:
+            encode(json.load(file))
+
+
+def test_optional_fields(tmp_path):
+    item = {
+        "speciesId": "azumarill", "speciesName": "Azumarill", "rating": 600, "score": 91.5,
+        "matchups": [{"opponent": "medicham", "rating": 700, "opRating": 300}, {"opponent": "skarmory", "rating": 550}],
+        "counters": [],
+        "moves": {"fastMoves": [{"moveId": "BUBBLE", "uses": 100}], "chargedMoves": [{"moveId": "PLAY_ROUGH", "uses": None}]},
+        "moveset": ["BUBBLE", "PLAY_ROUGH"],
+    }
+    path = tmp_path / "rankings.bin"
+    path.write_bytes(encode([item]))
+    assert RankingArtifact(path)[0] == {**item, "position": 1}
+
+
+def test_stale_artifact(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "RANKINGS_DIR", tmp_path / "fixtures")
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", tmp_path / "artifacts")
+    source = artifacts.fixture_path("all", "1500", "overall")
+    source.parent.mkdir(parents=True)
+    source.write_text("[]")
+    assert artifacts.open_artifact("all", "1500", "overall") is None
+    target = artifacts.artifact_path("all", "1500", "overall")
+    write_artifact(source, target)
+    assert len(artifacts.open_artifact("all", "1500", "overall")) == 0
+    os.utime(source, ns=(target.stat().st_mtime_ns + 10 ** 9,) * 2)
+    assert artifacts.open_artifact("all", "1500", "overall") is None
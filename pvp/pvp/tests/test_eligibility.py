@@ -0,0 +1,64 @@
+import pytest
+
+from pvp.engine.eligibility import LEAGUES, min_cp
+from pvp.engine.stats import compute_cp, default_ivs
+from pvp.loaders import open_fixture
+from pvp.registry import get_registry
+
+
+def matches(species, filter, cp) -> bool:
+    values = filter["values"]
+    kind = filter["filterType"]
+    if kind == "tag":
+        return any(species.has_tag(v) for v in values)
+    if kind == "type":
+        return any(t in values for t in species.types)
+    if kind == "id":
+        return species.species_id in values and int(cp) in filter.get("leagues", [int(cp)])
+    if kind == "dex":
+        return min(values) <= species.dex <= max(values)
+    if kind == "evolution":
+        family = species.family or {}
+        stage = 2 if family.get("parent") else 1
+        return bool(family.get("evolutions")) and stage in values
+    return False
+
+
+def is_eligible(species, cup, cp) -> bool:
+    """The per-species check the masks replaced."""
+    if not species.released or not species.fast_moves or not species.charged_moves:
+        return False
+    if any(matches(species, f, cp) for f in cup.get("exclude", [])):
+        return False
+    if any(f["filterType"] == "id" and matches(species, f, cp) for f in cup.get("include", [])):
+        return True
+    return all(matches(species, f, cp) for f in cup.get("include", []) if f["filterType"] != "id")
+
+
+def reaches(species, cp) -> bool:
+    level, *ivs = default_ivs(species, cp)
+    return compute_cp(species.base_stats, ivs, level) >= min_cp(cp)
+
+
+CUPS = open_fixture("gamemaster.json")["cups"]
+
+
+@pytest.mark.parametrize("cup", CUPS, ids=[cup["name"] for cup in CUPS])
+def test_masks(cup):
+    registry = get_registry()
+    index = registry.cup_index
+    for cp in LEAGUES:
+        mask = index.eligible(cup["name"], cp)
+        assert mask.tolist() == [is_eligible(s, cup, cp) for s in registry.species.values()], (cup["name"], cp)
+        # an unlisted cup definition compiles to the same mask
+        assert index.eligible(cup, cp).tolist() == mask.tolist()
+        expected = sorted(s.species_id for s in registry.species.values() if is_eligible(s, cup, cp) and reaches(s, cp))
+        assert index.pool(cup["name"], cp) == expected, (cup["name"], cp)
+
+
+def test_cups_for():
+    registry = get_registry()
+    index = registry.cup_index
+    for species in list(registry.species.values())[::25]:
+        expected = [(cup["name"], cp) for cup in CUPS for cp in LEAGUES if is_eligible(species, cup, cp)]
+        assert sorted(index.cups_for(species.species_id)) == sorted(expected), species.species_id
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from pvp import artifacts, fragments
+from pvp.fragments import RowFragments, encode, open_fragments, stamp
+
+
+@pytest.fixture
+def derived(tmp_path, monkeypatch):
+    paths = [tmp_path / "derived" / "a.npz", tmp_path / "derived" / "b.json"]
+    paths[0].parent.mkdir()
+    paths[0].write_bytes(b"a")
+    monkeypatch.setattr(fragments, "derived", lambda format, cp: paths)
+    return paths
+
+
+@pytest.fixture
+def scenario(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "RANKINGS_DIR", tmp_path / "fixtures")
+    monkeypatch.setattr(fragments, "FRAGMENTS_DIR", tmp_path / "fragments")
+    source = artifacts.fixture_path("all", "1500", "overall")
+    source.parent.mkdir(parents=True)
+    source.write_text("[]")
+    os.utime(source, ns=(source.stat().st_mtime_ns - 10 ** 9,) * 2)
+    return "all", "1500", "overall"
+
+
+def write(scenario, rows):
+    path = fragments.fragments_path(*scenario)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(encode(rows, stamp(*scenario[:2])))
+    return path
+
+
+def test_round_trip(tmp_path):
+    rows = ["<div>1</div>", "", "<div>é</div>" * 100]
+    path = tmp_path / "rankings.rows"
+    path.write_bytes(encode(rows, b"s" * 20))
+    read = RowFragments(path)
+    assert len(read) == 3
+    assert read.stamp == b"s" * 20
+    assert [read.row(p) for p in (1, 2, 3)] == rows
+
+
+def test_stamp_follows_derived(derived):
+    before = stamp("all", "1500")
+    assert stamp("all", "1500") == before
+    # a derived artifact that appears
+    derived[1].write_text("[]")
+    created = stamp("all", "1500")
+    assert created != before
+    # and one that is rebuilt
+    os.utime(derived[0], ns=(derived[0].stat().st_mtime_ns + 10 ** 9,) * 2)
+    assert stamp("all", "1500") != created
+
+
+def test_stale_after_rebuild(derived, scenario):
+    write(scenario, ["<div>1</div>"])
+    assert open_fragments(*scenario).row(1) == "<div>1</div>"
+    os.utime(derived[0], ns=(derived[0].stat().st_mtime_ns + 10 ** 9,) * 2)
+    assert open_fragments(*scenario) is None
+    write(scenario, ["<div>2</div>"])
+    assert open_fragments(*scenario).row(1) == "<div>2</div>"
+
+
+def test_stale_after_fixture(derived, scenario):
+    path = write(scenario, ["<div>1</div>"])
+    source = artifacts.fixture_path(*scenario)
+    os.utime(source, ns=(path.stat().st_mtime_ns + 10 ** 9,) * 2)
+    assert open_fragments(*scenario) is None
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from pvp.engine.ivs import IVS, MAX_LEVEL, build_table, iv_index, open_table, rank_ivs
+from pvp.engine.stats import LEVELS, compute_cp, compute_stats
+from pvp.registry import get_registry
+
+CAPS = [500, 1500, 2500, 10000]
+
+
+@pytest.fixture(scope="module")
+def species():
+    ids = ["azumarill", "medicham", "shuckle", "mewtwo"]
+    return [get_registry().species[s] for s in ids if s in get_registry().species]
+
+
+def brute_force(base_stats, cap):
+    """(level index, product, atk) of every IV spread, the level searched down from MAX_LEVEL."""
+    top = int(np.nonzero(LEVELS <= MAX_LEVEL)[0][-1])
+    rows = []
+    for atk, defense, hp in IVS.tolist():
+        level = next((i for i in range(top, -1, -1) if compute_cp(base_stats, (atk, defense, hp), LEVELS[i]) <= cap), 0)
+        a, d, h = compute_stats(base_stats, (atk, defense, hp), LEVELS[level])
+        product = a * d * h if compute_cp(base_stats, (atk, defense, hp), LEVELS[level]) <= cap else 0
+        rows.append((level, product, base_stats["atk"] + atk))
+    return rows
+
+
+@pytest.mark.parametrize("cap", CAPS)
+def test_rank_ivs(species, cap):
+    tables = rank_ivs([[s.base_stats["atk"], s.base_stats["def"], s.base_stats["hp"]] for s in species], cap)
+    for row, s in enumerate(species):
+        expected = brute_force(s.base_stats, cap)
+        order = sorted(range(len(expected)), key=lambda i: (-expected[i][1], -expected[i][2], i))
+        assert tables["order"][row].tolist() == order, s.species_id
+        assert tables["level"][row].tolist() == [level for level, _, _ in expected], s.species_id
+        ranks = np.empty(len(order), dtype=int)
+        ranks[order] = np.arange(1, len(order) + 1)
+        assert tables["rank"][row].tolist() == ranks.tolist(), s.species_id
+
+
+def test_saved_table(tmp_path, species):
+    build_table(species, 1500, tmp_path)
+    table = open_table(1500, tmp_path, species)
+    assert table is not None
+    expected = rank_ivs([[s.base_stats["atk"], s.base_stats["def"], s.base_stats["hp"]] for s in species], 1500)
+    for row, s in enumerate(species):
+        assert table.rank_of(s.species_id, (0, 15, 15)) == expected["rank"][row, iv_index(0, 15, 15)]
+        best = table.top(s.species_id)[0]
+        assert best["rank"] == 1
+        assert best["cp"] <= 1500
+    # built for other species, the table is out of date
+    assert open_table(1500, tmp_path, species[:-1]) is None
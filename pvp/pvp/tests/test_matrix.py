@@ -0,0 +1,22 @@
+import pytest
+
+from pvp.engine.battle import Combatant, simulate
+from pvp.engine.matrix import Roster, rating_matrix
+from pvp.engine.rankings import choose_moveset
+from pvp.registry import get_registry
+
+
+@pytest.fixture(scope="module")
+def combatants():
+    registry = get_registry()
+    pool = [s for s in registry.species.values() if s.released and s.fast_moves and s.charged_moves][::40][:16]
+    return [Combatant(s, *choose_moveset(registry, s, {}, {}), 1500) for s in pool]
+
+
+@pytest.mark.parametrize("shields, energy", [((1, 1), (0, 0)), ((0, 0), (0, 0)), ((2, 0), (0, 0)), ((1, 1), (4, 0))])
+def test_matches_simulate(combatants, shields, energy):
+    matrix = rating_matrix(Roster(combatants), shields, energy, chunk_size=50)
+    for i, a in enumerate(combatants):
+        for j, b in enumerate(combatants):
+            if i != j:
+                assert matrix[i, j] == simulate(a, b, shields, energy).ratings[0], (a.species.species_id, b.species.species_id)
@@ -0,0 +1,39 @@
+from pvp.engine.movecounts import CYCLES, MoveCounts
+from pvp.registry import get_registry
+
+
+def brute_force(gain, cost):
+    """Fast moves used for each of CYCLES charged moves in a row, starting at zero energy."""
+    if gain <= 0:
+        return (0,) * CYCLES
+    energy, counts = 0, []
+    for _ in range(CYCLES):
+        count = 0
+        while energy < cost:
+            energy += gain
+            count += 1
+        energy -= cost
+        counts.append(count)
+    return tuple(counts)
+
+
+def test_counts():
+    registry = get_registry()
+    counts = MoveCounts(registry.fast_moves, registry.charged_moves)
+    for fast in registry.fast_moves.values():
+        for charged in registry.charged_moves.values():
+            expected = brute_force(fast.energy_gain, charged.energy)
+            assert counts(fast.move_id, charged.move_id) == expected, (fast.move_id, charged.move_id)
+            assert counts.first(fast.move_id, charged.move_id) == expected[0]
+
+
+def test_suffix():
+    registry = get_registry()
+    counts = MoveCounts(registry.fast_moves, registry.charged_moves)
+    for fast in registry.fast_moves.values():
+        for charged in registry.charged_moves.values():
+            first, second, third = brute_force(fast.energy_gain, charged.energy)
+            suffix = counts.suffix(fast.move_id, charged.move_id)
+            assert suffix.startswith(str(first))
+            assert suffix.endswith("-") == (first > second)
+            assert suffix.endswith(".") == (first == second > third)
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from pvp.search import BATCH_SIZE, RankingIndex, Selection, filter_rankings
+
+SPECIES = {
+    "azumarill": (["water", "fairy"], []),
+    "medicham": (["fighting", "psychic"], []),
+    "medicham_shadow": (["fighting", "psychic"], ["shadow"]),
+    "registeel": (["steel", "none"], ["legendary"]),
+    "skarmory": (["steel", "flying"], []),
+    "swampert_shadow": (["water", "ground"], ["shadow"]),
+}
+MOVES = {
+    "azumarill": ["BUBBLE", "ICE_BEAM", "PLAY_ROUGH"],
+    "medicham": ["COUNTER", "ICE_PUNCH", "PSYCHIC"],
+    "medicham_shadow": ["COUNTER", "ICE_PUNCH", "DYNAMIC_PUNCH"],
+    "registeel": ["LOCK_ON", "FLASH_CANNON", "FOCUS_BLAST"],
+    "skarmory": ["AIR_SLASH", "SKY_ATTACK", "FLASH_CANNON"],
+    "swampert_shadow": ["MUD_SHOT", "HYDRO_CANNON", "EARTHQUAKE"],
+}
+
+
+@pytest.fixture
+def rankings():
+    return [{"speciesId": s, "speciesName": s.replace("_", " ").title(), "moveset": MOVES[s], "position": i}
+            for i, s in enumerate(SPECIES, 1)]
+
+
+@pytest.fixture
+def index(rankings):
+    registry = SimpleNamespace(species={s: SimpleNamespace(types=t, tags=g) for s, (t, g) in SPECIES.items()})
+    return RankingIndex(rankings, registry)
+
+
+def brute_force(rankings, types=(), moves=(), tags=(), name=""):
+    def keep(item):
+        species_types, species_tags = SPECIES[item["speciesId"]]
+        species_types = [t for t in species_types if t != "none"]
+        return ((not types or any(t.lower() in species_types for t in types))
+                and (not moves or any(m.upper() in item["moveset"] for m in moves))
+                and (not tags or any(t.lower() in species_tags for t in tags))
+                and (not name or item["speciesName"].lower().startswith(name.lower())
+                     or item["speciesId"].startswith(name.lower())))
+    return [item["position"] for item in rankings if keep(item)]
+
+
+@pytest.mark.parametrize("filters", [
+    {"types": ["steel"]},
+    {"types": ["Water", "psychic"]},
+    {"moves": ["flash_cannon"]},
+    {"moves": ["COUNTER", "MUD_SHOT"], "tags": ["shadow"]},
+    {"types": ["fighting"], "tags": ["shadow"]},
+    {"name": "med"},
+    {"name": "Medicham S"},
+    {"types": ["steel"], "moves": ["BUBBLE"]},
+    {"types": ["none"]},
+    {"moves": ["NOT_A_MOVE"]},
+])
+def test_search(index, rankings, filters):
+    assert index.search(**filters).tolist() == brute_force(rankings, **filters)
+
+
+def test_no_filters(index, rankings):
+    assert index.search() is None
+    assert filter_rankings(rankings, "all", "1500", "overall", {"types": [], "moves": [], "tags": [], "name": "", "top": []}) is rankings
+
+
+def test_selection(rankings):
+    selection = Selection(rankings, np.array([2, 3, 5], dtype=np.int32))
+    assert len(selection) == 3
+    assert [item["position"] for item in selection] == [2, 3, 5]
+    assert selection[1] == rankings[2]
+    assert selection[1:] == [rankings[2], rankings[4]]
+    assert selection.index_after(0) == 0
+    assert selection.index_after(3) == 2
+    assert selection.index_after(5) == 3
+
+
+def test_selection_batches():
+    rankings = [{"position": i} for i in range(1, 2 * BATCH_SIZE + 10)]
+    positions = np.arange(1, len(rankings) + 1, 2, dtype=np.int32)
+    assert [item["position"] for item in Selection(rankings, positions)] == positions.tolist()
+
+
+def test_stored_index_rows():
+    from pvp.models import Scenario
+    from pvp.ranking_store import open_stored_ranking
+    from pvp.registry import get_registry
+    scenario = Scenario.objects.select_related("format").filter(entries__isnull=False).first()
+    if scenario is None:
+        pytest.skip("no stored rankings")
+    stored = open_stored_ranking(scenario.format.cup, scenario.format.cp, scenario.category)
+    full, narrow = RankingIndex(list(stored), get_registry()), RankingIndex(stored.index_rows(), get_registry())
+    assert narrow.names == full.names
+    assert narrow.name_positions.tolist() == full.name_positions.tolist()
+    for name in ("types", "moves", "tags"):
+        assert {k: v.tolist() for k, v in getattr(narrow, name).items()} == {k: v.tolist() for k, v in getattr(full, name).items()}
@@ -16,17 +16,20 @@ Including another URLconf
 """
 from django.contrib import admin
 from . import views
-from .views import rankings
+from .views import api, battle, metrics, rankings, teams
 from django.urls import path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('', views.index, name='index'),
-    path('battle/', views.index, name='battle'),
+    path('battle/', battle.battle, name='battle'),
+    path('battle/simulate/', battle.simulate_battle, name='simulate'),
     path('rankings/', rankings.rankings, name='rankings'),
     path('rankings/<str:format>/<str:cp>/', rankings.rankings, name='rankings'),
     path('rankings/<str:format>/<str:cp>/<str:category>/', rankings.rankings, name='rankings'),
     path('rankings/<str:format>/<str:cp>/<str:category>/<int:pos>/moves/', rankings.get_move),
-    path('team_builder/', views.index, name='team'),
+    path('team_builder/', teams.team_builder, name='team'),
+    path('api/rankings/<str:cup>/<str:cp>/<str:category>/', api.rankings, name='api_rankings'),
+    path('metrics/', metrics.metrics, name='metrics'),
     
 ]
@@ -0,0 +1,65 @@
+import json
+
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import HtmxHttpRequest
+from .caching import cached_payload
+from pvp.search import Selection, filter_params, filter_rankings
+from .rankings import load_ranking_context
+from .utils import get_int
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+def get_fields(request) -> list | None:
+    fields = [f for f in request.GET.get("fields", "").split(",") if f]
+    return fields or None
+
+def project(item: dict, fields) -> dict:
+    if fields is None:
+        return dict(item)
+    return {field: item[field] for field in fields if field in item}
+
+def stream_ndjson(rankings, fields):
+    for item in rankings:
+        yield json.dumps(project(item, fields), separators=(",", ":")) + "\n"
+
+@require_GET
+@cached_payload
+def rankings(request: HtmxHttpRequest, cup: str, cp: str, category: str) -> HttpResponse:
+    """Ranking items after a position (``?after=&limit=``), or all of them as NDJSON with ``?stream=1``.
+
+    ``?fields=speciesId,score`` keeps only the listed keys of each item, and the
+    ranking filters (``?type=&move=&tag=&q=``) apply as on the rankings page.
+    """
+    try:
+        rankings = load_ranking_context(cup, cp, category)
+    except FileNotFoundError:
+        raise Http404(f"No rankings for {cup} {cp} {category}")
+    rankings = filter_rankings(rankings, cup, cp, category, filter_params(request))
+    fields = get_fields(request)
+    # only the query string picks the representation: the ETag and the cache key are per URL
+    if request.GET.get("stream"):
+        return StreamingHttpResponse(stream_ndjson(rankings, fields), content_type="application/x-ndjson")
+
+    total = len(rankings)
+    after = get_int(request, "after", 0, 0, 1 << 31)
+    limit = get_int(request, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+    start = rankings.index_after(after) if isinstance(rankings, Selection) else min(after, total)
+    page = rankings[start:start + limit]
+    next_after = page[-1]["position"] if start + len(page) < total else None
+    return JsonResponse({
+        "cup": cup,
+        "cp": cp,
+        "category": category,
+        "count": total,
+        "next": None if next_after is None else f"{request.path}?{_query(request, after=next_after)}",
+        "results": [project(item, fields) for item in page],
+    })
+
+def _query(request, **params) -> str:
+    query = request.GET.copy()
+    for key, value in params.items():
+        query[key] = value
+    return query.urlencode(safe=",")
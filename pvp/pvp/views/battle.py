@@ -0,0 +1,51 @@
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from pvp.cache import versioned_cache
+from pvp.engine.battle import Combatant, simulate
+from pvp.registry import get_registry
+
+from . import HtmxHttpRequest
+from .rankings import load_ranking_context
+from .utils import get_int
+
+LEAGUES = ["500", "1500", "2500", "10000"]
+
+@versioned_cache(maxsize=8)
+def ranked_movesets(cp: str) -> dict:
+    """speciesId -> recommended moveset from the overall rankings of a league."""
+    return {item["speciesId"]: item["moveset"] for item in load_ranking_context("all", cp, "overall")}
+
+def build_combatant(species_id: str, cp: str, moves: str = "") -> Combatant:
+    registry = get_registry()
+    species = registry.species.get(species_id)
+    if species is None:
+        raise Http404(f"Unknown pokemon {species_id}")
+    moveset = [m for m in moves.split(",") if m] or ranked_movesets(cp).get(species_id)
+    if not moveset:
+        moveset = [m.move_id for m in species.fast_moves[:1] + species.charged_moves[:2]]
+    try:
+        fast_move = registry.fast_moves[moveset[0]]
+        charged_moves = [registry.charged_moves[m] for m in moveset[1:3]]
+    except (IndexError, KeyError):
+        raise Http404(f"Invalid moveset for {species_id}")
+    return Combatant(species, fast_move, charged_moves, int(cp))
+
+@require_GET
+def battle(request: HtmxHttpRequest) -> HttpResponse:
+    species = sorted(get_registry().species.values(), key=lambda s: s.species_name)
+    return render(request, "battle.html", {"species": species, "leagues": LEAGUES})
+
+@require_GET
+def simulate_battle(request: HtmxHttpRequest) -> HttpResponse:
+    cp = request.GET.get("cp", "1500")
+    if cp not in LEAGUES:
+        raise Http404(f"Unknown league {cp}")
+    if not request.GET.get("p1") or not request.GET.get("p2"):
+        return render(request, "battle_result.html", {})
+    a = build_combatant(request.GET["p1"], cp, request.GET.get("moves1", ""))
+    b = build_combatant(request.GET["p2"], cp, request.GET.get("moves2", ""))
+    shields = (get_int(request, "shields1", 1, 0, 2), get_int(request, "shields2", 1, 0, 2))
+    result = simulate(a, b, shields, timeline=True)
+    return render(request, "battle_result.html", {"combatants": (a, b), "result": result})
@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from pvp.cache import data_last_modified, data_version
+from pvp.metrics import cache_lookup
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# smaller bodies aren't worth a Content-Encoding
+MIN_COMPRESS_SIZE = 512
+
+def accepted_encoding(request) -> str:
+    """Best of br, gzip and identity that the client accepts."""
+    accepted = {}
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+def encode_variants(content: bytes) -> dict:
+    """The body in every encoding we serve, built once when it is cached."""
+    variants = {"identity": content}
+    if len(content) >= MIN_COMPRESS_SIZE:
+        variants["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            variants["br"] = brotli.compress(content, mode=brotli.MODE_TEXT)
+    return variants
+
+def encoded_response(variants: dict, content_type: str, encoding: str) -> HttpResponse:
+    if encoding not in variants:
+        encoding = "identity"
+    response = HttpResponse(variants[encoding], content_type=content_type)
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+def fragment_etag(request) -> str:
+    """ETag of a response that only depends on the URL, the HTMX flag and the data version.
+
+    It is weak so that it stays valid across the content encodings of the same body.
+    """
+    digest = hashlib.sha1(f"{data_version()}|{bool(request.htmx)}|{request.get_full_path()}".encode())
+    return f'W/"{digest.hexdigest()[:24]}"'
+
+def _cached_response(request, view, args, kwargs, key):
+    cached = cache.get(key)
+    cache_lookup(cached is not None)
+    if cached is None:
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200 or response.streaming:
+            return response
+        cached = (encode_variants(response.content), response["Content-Type"])
+        cache.set(key, cached, settings.FRAGMENT_CACHE_TIMEOUT)
+    return encoded_response(*cached, accepted_encoding(request))
+
+async def _acached_response(request, view, args, kwargs, key):
+    cached = await cache.aget(key)
+    cache_lookup(cached is not None)
+    if cached is None:
+        response = await view(request, *args, **kwargs)
+        if response.status_code != 200 or response.streaming:
+            return response
+        variants = await sync_to_async(encode_variants, thread_sensitive=False)(response.content)
+        cached = (variants, response["Content-Type"])
+        await cache.aset(key, cached, settings.FRAGMENT_CACHE_TIMEOUT)
+    return encoded_response(*cached, accepted_encoding(request))
+
+def _validators(request):
+    return fragment_etag(request), data_last_modified()
+
+def _finish(response, etag, last_modified, cacheable):
+    if response.status_code in (200, 304):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+    patch_vary_headers(response, ("HX-Request", "Accept-Encoding") if cacheable else ("HX-Request",))
+    return response
+
+def _conditional(view, cache_full_pages):
+    if iscoroutinefunction(view):
+        return _aconditional(view, cache_full_pages)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        etag, last_modified = _validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        cacheable = request.htmx or cache_full_pages
+        if response is None:
+            if cacheable:
+                response = _cached_response(request, view, args, kwargs, f"fragment:{etag}")
+            else:
+                response = view(request, *args, **kwargs)
+        return _finish(response, etag, last_modified, cacheable)
+    return wrapper
+
+def _aconditional(view, cache_full_pages):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # the data version may need a database round trip
+        etag, last_modified = await sync_to_async(_validators)(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        cacheable = request.htmx or cache_full_pages
+        if response is None:
+            if cacheable:
+                response = await _acached_response(request, view, args, kwargs, f"fragment:{etag}")
+            else:
+                response = await view(request, *args, **kwargs)
+        return _finish(response, etag, last_modified, cacheable)
+    return wrapper
+
+def cached_fragment(view):
+    """Answer conditional GETs from the data version and keep rendered HTMX fragments in the cache.
+
+    Cached fragments are stored with gzip and brotli variants and served in the encoding
+    the client prefers. Full pages get the validators too, but only their expensive blocks
+    are cached (with ``{% cache %}`` in the template) since they carry a per-user CSRF token.
+    """
+    return _conditional(view, cache_full_pages=False)
+
+def cached_payload(view):
+    """Like cached_fragment for responses without user state, e.g. JSON; streaming responses pass through."""
+    return _conditional(view, cache_full_pages=True)
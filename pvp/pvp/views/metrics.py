@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from pvp.cache import cache_stats
+from pvp.metrics import registry
+
+from . import HtmxHttpRequest
+
+@require_GET
+def metrics(request: HtmxHttpRequest) -> HttpResponse:
+    """Request histograms and the sizes of the versioned caches in the Prometheus text format.
+
+    Only for staff and the addresses in METRICS_ALLOWED_IPS.
+    """
+    if not request.user.is_staff and request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    lines = [registry.exposition()]
+    for name, info in sorted(cache_stats().items()):
+        for field in ("hits", "misses", "currsize"):
+            lines.append(f'pvp_versioned_cache_{field}{{cache="{name}"}} {info[field]}\n')
+    return HttpResponse("".join(lines), content_type="text/plain; version=0.0.4")
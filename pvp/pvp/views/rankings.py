@@ -1,60 +1,127 @@
 import json
-from functools import lru_cache
+
+from asgiref.sync import sync_to_async
 from django.core.paginator import Paginator
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_GET
 
-from pvp.models import Format, Pokemon, Scenario, FastMove
+from pvp import ranking_store
+from pvp.artifacts import fixture_path, open_artifact
+from pvp.cache import data_version, versioned_cache
+from pvp.fragments import open_fragments
+from pvp.models import Pokemon
+from pvp.registry import get_registry
+from pvp.search import filter_params, filter_rankings
 
 from . import HtmxHttpRequest
+from .caching import cached_fragment
 
-@lru_cache
+@versioned_cache(maxsize=32)
 def load_ranking_context(format="all", cp="1500", category="overall"):
-    with open(f"pvp/fixtures/rankings/{format}/{category}/rankings-{cp}.json") as file:
+    if ranking_store.enabled():
+        stored = ranking_store.open_stored_ranking(format, cp, category)
+        if stored is not None:
+            return stored
+    return load_ranking_file(format, cp, category)
+
+def load_ranking_file(format="all", cp="1500", category="overall"):
+    artifact = open_artifact(format, cp, category)
+    if artifact is not None:
+        return artifact
+    with open(fixture_path(format, cp, category)) as file:
         rankings = json.load(file)
     for i in range(len(rankings)):
         rankings[i]["position"] = i+1
     return rankings
 
-@lru_cache
+@versioned_cache(maxsize=1024)
 def get_moveset_at_position(format:str, cp:str, category:str, pos: int):
     item = load_ranking_context(format, cp, category)[pos-1]
-    pokemon = Pokemon.objects.get(species_id=item.get('speciesId'))
-    moveset = item.get("moveset")
-    return pokemon, moveset
+    return item.get('speciesId'), item.get("moveset")
+
+async def aget_pokemon(species_id: str):
+    """The species with its moves and tags, fetched with the async ORM."""
+    pokemon = await (Pokemon.objects.prefetch_related("fast_moves", "charged_moves", "tags")
+                     .aget(species_id=species_id))
+    # the M2M managers iterate their prefetched rows, no further queries
+    fast_moves = [m async for m in pokemon.fast_moves.all()]
+    charged_moves = [m async for m in pokemon.charged_moves.all()]
+    return pokemon, fast_moves, charged_moves
+
+async def aload_ranking_context(format="all", cp="1500", category="overall"):
+    # mapping an artifact or parsing a fixture is file I/O, keep it off the event loop;
+    # stored rankings query the database, which has to stay on the request's thread
+    load = sync_to_async(load_ranking_context, thread_sensitive=ranking_store.enabled())
+    return await load(format, cp, category)
 
 def get_page_by_request(request, queryset, paginate_by=20):
     return Paginator(queryset, per_page=paginate_by).get_page(request.GET.get("page", default=1))
 
+def render_rankings_table(request, rankings, format, cp, category):
+    fragments = open_fragments(format, cp, category)
+    if fragments is not None and len(fragments) != len(rankings):
+        fragments = None
+    rankings = filter_rankings(rankings, format, cp, category, filter_params(request))
+    query = request.GET.copy()
+    query.pop("page", None)
+    query = query.urlencode() + "&" if query else ""
+    page = get_page_by_request(request, rankings)
+    if fragments is not None:
+        return HttpResponse(fragments.page(page, query))
+    return render(request, "ranking_table.html", {
+        "rankings": page,
+        "cup": format,
+        "cp": cp,
+        "query": query,
+    })
+
+def render_rankings_page(request, scenario, formats):
+    return render(request,
+                  'rankings.html', 
+                  {
+                      "current_scenario": scenario,
+                      "formats": formats,
+                      "categories": ["overall", "leads", "closers", "switches", "chargers", "attackers", "consistency"],
+                      "version": data_version(),
+                      }
+                  )
+
 @require_GET
-def rankings(request: HtmxHttpRequest, format="all", cp="1500", category="overall") -> HttpResponse:
-    format_obj = Format.objects.get(cup=format, cp=cp)
-    scenario_obj, create = Scenario.objects.get_or_create(format=format_obj, category=category)
-    rankings = load_ranking_context(format, cp, category)
+@cached_fragment
+async def rankings(request: HtmxHttpRequest, format="all", cp="1500", category="overall") -> HttpResponse:
+    # formats and scenarios come from the registry, so serving a page needs no SQL
+    registry = await sync_to_async(get_registry)()
+    scenario_obj = registry.scenario(format, cp, category)
+    if scenario_obj is None:
+        raise Http404(f"No rankings for {format} {cp} {category}")
+    rankings = await aload_ranking_context(format, cp, category)
+    # template filters read the registry, which may have to reload from the database
     if request.htmx:
-        template = "ranking_table.html"
-        return render(request, template, {"rankings": get_page_by_request(request, rankings),})
+        return await sync_to_async(render_rankings_table)(request, rankings, format, cp, category)
     else:
-        formats = Format.objects.filter(show=True)
-        template = 'rankings.html'
-        return render(request,
-                      template, 
-                      {
-                          "current_scenario": scenario_obj,
-                          "formats": formats,
-                          "categories": ["overall", "leads", "closers", "switches", "chargers", "attackers", "consistency"],
-                          }
-                      )
+        return await sync_to_async(render_rankings_page)(request, scenario_obj, registry.shown_formats)
     
 @require_GET
-def get_move(request: HtmxHttpRequest, format:str, cp:str, category:str, pos: int) -> HttpResponse:
-    pokemon_obj, moveset = get_moveset_at_position(format, cp, category, pos)
+@cached_fragment
+async def get_move(request: HtmxHttpRequest, format:str, cp:str, category:str, pos: int) -> HttpResponse:
+    registry = await sync_to_async(get_registry)()
+    if registry.scenario(format, cp, category) is None or pos < 1:
+        raise Http404(f"No rankings for {format} {cp} {category}")
+    load = sync_to_async(get_moveset_at_position, thread_sensitive=ranking_store.enabled())
+    try:
+        species_id, moveset = await load(format, cp, category, pos)
+    except IndexError:
+        raise Http404(f"No position {pos} in {format} {cp} {category}")
+    try:
+        pokemon_obj, fast_moves, charged_moves = await aget_pokemon(species_id)
+    except Pokemon.DoesNotExist:
+        raise Http404(f"No species {species_id}")
     
-    return render(request, "move_tab.html", 
+    return await sync_to_async(render)(request, "move_tab.html", 
                   {
-                      "fast_moves": pokemon_obj.fast_moves.all(), 
-                      "charged_moves": pokemon_obj.charged_moves.all(),
+                      "fast_moves": fast_moves, 
+                      "charged_moves": charged_moves,
                       "pokemon": pokemon_obj,
                       "moveset": moveset
                       }
@@ -0,0 +1,34 @@
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from pvp.engine.teams import get_team_matrix
+from pvp.registry import get_registry
+
+from . import HtmxHttpRequest
+from .battle import LEAGUES
+
+@require_GET
+def team_builder(request: HtmxHttpRequest) -> HttpResponse:
+    cup = request.GET.get("cup", "all")
+    cp = request.GET.get("cp", "1500")
+    if cp not in LEAGUES:
+        raise Http404(f"Unknown league {cp}")
+    matrix = get_team_matrix(cup, cp)
+    if matrix is None:
+        raise Http404(f"No team matrix built for {cup} {cp}")
+    species = get_registry().species
+    team = [s for s in (request.GET.get(f"p{i}") for i in range(1, 4)) if s in matrix]
+    context = {
+        "cup": cup,
+        "cp": cp,
+        "team": [species[s] for s in team],
+        "coverage": matrix.coverage(team),
+        "threats": [(species[s], rating) for s, rating in matrix.threats(team)],
+        "suggestions": [([species[s] for s in added], coverage) for added, coverage in matrix.suggest(team)],
+    }
+    if request.htmx:
+        return render(request, "team_result.html", context)
+    context["species"] = sorted((species[s] for s in matrix.species), key=lambda s: s.species_name)
+    context["leagues"] = LEAGUES
+    return render(request, "team_builder.html", context)
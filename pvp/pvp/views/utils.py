@@ -0,0 +1,6 @@
+def get_int(request, name, default, low, high):
+    """Integer query parameter clamped to [low, high]; ``default`` when it isn't a number."""
+    try:
+        return min(max(int(request.GET.get(name, default)), low), high)
+    except ValueError:
+        return default
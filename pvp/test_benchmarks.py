@@ -0,0 +1,53 @@
+"""pytest-benchmark entry point for the cases of ``pvp.benchmarks``.
+
+    pytest test_benchmarks.py --benchmark-autosave
+
+Like ``manage.py benchmark`` the cases run against the configured database.
+load_data is left to the command since it rewrites the data.
+"""
+import pytest
+from django.conf import settings
+from django.test.utils import override_settings
+
+from pvp import benchmarks
+
+# the largest rankings depend on the loaded data, so they are parametrized by size
+IDS = [f"load_ranking_context[{i}]" for i in range(1, benchmarks.LARGEST_FILES + 1)] + [
+    "rankings[page]", "rankings[htmx]", "rankings[htmx, page 5]", "get_move", "template filters",
+]
+
+
+@pytest.fixture(scope="session")
+def cases():
+    # built on first use rather than at collection: they look up the registry and the database
+    cases = benchmarks.cases(load_data=False)
+    largest = [case for case in cases if case.name.startswith("load_ranking_context")]
+    return {**{f"load_ranking_context[{i}]": case for i, case in enumerate(largest, 1)},
+            **{case.name: case for case in cases}}
+
+
+@pytest.fixture
+def case(request, cases, benchmark):
+    if request.param not in cases:
+        pytest.skip(f"{request.param} isn't loaded")
+    case = cases[request.param]
+    benchmark.extra_info["case"] = case.name
+    return case
+
+
+@pytest.fixture(scope="module", autouse=True)
+def testserver():
+    # the test client talks to "testserver"
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        yield
+
+
+@pytest.mark.parametrize("case", IDS, indirect=True)
+def test_cold(benchmark, case):
+    benchmark.pedantic(case.func, setup=benchmarks.cold, rounds=case.repeat)
+
+
+@pytest.mark.parametrize("case", IDS, indirect=True)
+def test_warm(benchmark, case):
+    case.func()
+    benchmark.pedantic(case.func, rounds=case.repeat)